@@ -0,0 +1,158 @@
+import asyncio, time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import net
+from net import Wait, TTL, THROTTLED, DEFAULT_TIMEOUT, _target
+from throttle import SCHEDULER, AsyncHostScheduler, retry_after
+from metrics import METRICS
+
+# Capa HTTP del motor asyncio de enrich (async_engine.py), gemela de net.py: aiohttp con
+# un pool de conexiones por ejecución y los presupuestos por host de throttle.py con un
+# asyncio.Semaphore por host (AsyncHostScheduler), así que cientos de ítems pueden estar
+# esperando red sin ocupar un hilo cada uno. Usa la caché sqlite de net (la misma sesión
+# de requests-cache y las mismas claves): lo que descarga un motor lo reutiliza el otro.
+# Las consultas a SQLite local (caché, almacenes, planificador) se hacen en el propio bucle.
+
+RETRIES = 3                      # como el Retry de net._mount: 500/502/504 y errores de conexión
+RETRY_STATUS = (500, 502, 504)
+WAIT_POLL = 0.02                 # s entre comprobaciones de un Wait (búsqueda de otra corrutina)
+_HOP = ("accept-encoding", "connection")   # los pone aiohttp
+
+_HTTP = None     # aiohttp.ClientSession de la ejecución en curso (ver session())
+_SCHED = None
+_requests = ContextVar("anet_requests", default=0)
+
+
+def requests_made():
+    """Peticiones HTTP reales (sin caché) hechas por la tarea actual."""
+    return _requests.get()
+
+
+@asynccontextmanager
+async def session(limit=200):
+    """Sesión aiohttp y planificador por host (con los límites vigentes) para una ejecución."""
+    global _HTTP, _SCHED
+    import aiohttp   # pip install aiohttp
+    _SCHED = AsyncHostScheduler(SCHEDULER.limits, SCHEDULER.default)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit)) as http:
+        _HTTP = http
+        try:
+            yield http
+        finally:
+            _HTTP = _SCHED = None
+
+
+def _prepare(url, kwargs):
+    """La misma petición preparada que haría net.GET: URL final con params y clave de caché."""
+    import requests
+    return net.session().prepare_request(
+        requests.Request("GET", _target(url), params=kwargs.get("params"), headers=kwargs.get("headers")))
+
+
+def _response(req, status, reason, headers, body, url):
+    """requests.Response con lo recibido, para que las fuentes y requests-cache lo traten igual."""
+    import requests, urllib3
+    from requests.structures import CaseInsensitiveDict
+    r = requests.Response()
+    r.status_code, r.reason, r.url, r.request = status, reason, url, req
+    # aiohttp ya ha descomprimido el cuerpo
+    r.headers = CaseInsensitiveDict({k: v for k, v in headers.items()
+                                     if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")})
+    r._content = body
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    r.raw = urllib3.HTTPResponse(headers=dict(r.headers), status=status, reason=reason,
+                                 preload_content=False, request_url=url)
+    return r
+
+
+async def _fetch(req, headers, timeout):
+    """(status, reason, cabeceras, cuerpo, url final), con los reintentos de net._mount."""
+    import aiohttp
+    from yarl import URL
+    for i in range(RETRIES + 1):
+        if i > 1:
+            await asyncio.sleep(0.5 * 2 ** (i - 1))
+        try:
+            async with _HTTP.get(URL(req.url, encoded=True), headers=headers,
+                                 timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+                body = await r.read()
+                if r.status not in RETRY_STATUS or i == RETRIES:
+                    return r.status, r.reason, dict(r.headers), body, str(r.url)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if i == RETRIES:
+                raise
+
+
+async def _scheduled(url, req, headers, timeout, attempts=3):
+    # como net._scheduled: turno del host, y si el host nos frena se bloquea sólo ese host
+    for _ in range(attempts):
+        async with _SCHED.slot(url):
+            t = time.perf_counter()
+            status, reason, hdrs, body, final = await _fetch(req, headers, timeout)
+        _requests.set(_requests.get() + 1)
+        METRICS.request((time.perf_counter() - t) * 1000, len(body))
+        r = _response(req, status, reason, hdrs, body, final)
+        if status not in THROTTLED:
+            return r
+        _SCHED.backoff(url, retry_after(r))
+    return r
+
+
+async def GET(url, ttl="page", **kwargs):
+    """net.GET en asyncio: misma caché y TTL; las respuestas de caché no consumen presupuesto."""
+    timeout = kwargs.get("timeout", DEFAULT_TIMEOUT)
+    req = _prepare(url, kwargs)
+    headers = {k: v for k, v in req.headers.items() if k.lower() not in _HOP}
+    s = net.session()
+    if not net.CACHED:
+        return await _scheduled(url, req, headers, timeout)
+    expire = TTL.get(ttl, ttl) if isinstance(ttl, str) else ttl
+    key = s.cache.create_key(req)
+    cached = s.cache.get_response(key)
+    hit = cached is not None and not cached.is_expired
+    METRICS.cache(hit=hit)
+    if hit:
+        return cached
+    # entrada caducada: se revalida con sus validadores y un 304 la renueva sin descargar
+    if cached is not None:
+        if cached.headers.get("ETag"):
+            headers["If-None-Match"] = cached.headers["ETag"]
+        if cached.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+    try:
+        r = await _scheduled(url, req, headers, timeout)
+    except Exception:
+        if cached is None:
+            raise
+        return cached   # stale_if_error, como la sesión de net
+    from requests_cache.policy.expiration import get_expiration_datetime
+    if cached is not None and r.status_code == 304:
+        s.cache.save_response(cached, key, get_expiration_datetime(expire))
+        return cached
+    if cached is not None and r.status_code >= 400:
+        return cached
+    if r.status_code in s.settings.allowable_codes:
+        s.cache.save_response(r, key, get_expiration_datetime(expire))
+    return r
+
+
+async def run(steps):
+    """net.run en asyncio: recorre una fuente-generador haciendo sus peticiones con anet.GET."""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                if isinstance(step, Wait):
+                    while not step.event.is_set():
+                        await asyncio.sleep(WAIT_POLL)
+                    out = True
+                else:
+                    out = await GET(step.url, step.ttl, **step.kwargs)
+            except Exception as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(out)
+    except StopIteration as stop:
+        return stop.value
+    finally:
+        steps.close()
@@ -1,53 +1,153 @@
-import argparse
-from discogs_client import fetch_collection
-from enrich import enrich_release_dates, enrich_missing_only
-from utils import upcoming_anniversaries, load_json, ensure_data_dir
+import argparse, json, datetime
+from utils import AnniversaryIndex, ensure_data_dir, save_json
+import store
+import metrics
 
-def cmd_update():
+# Los módulos de red (discogs_client, enrich -> sources -> net, lxml, rapidfuzz,
+# requests-cache...) se importan dentro de los comandos que los usan: anniversaries y
+# month, que corren desde cron, sólo leen el almacén y arrancan sin cargarlos.
+
+def cmd_update(workers=4, incremental=False):
+    from discogs_client import fetch_collection, sync_collection
     ensure_data_dir()
-    count = fetch_collection()
+    if incremental:
+        new, removed, total = sync_collection(workers=workers)
+        print(f"OK. {len(new)} nuevos, {len(removed)} eliminados. Total en Discogs: {total}")
+        for it in removed:
+            print(f"- eliminado: {it.get('artist_clean') or it.get('artist')} — {it.get('title')}")
+        return
+    count = fetch_collection(workers=workers)
     print(f"OK. Se guardaron {count} ítems en data/collection.raw.json")
 
-def cmd_enrich():
+def cmd_enrich(incremental=False, race=False, engine="threads", concurrency=None):
+    from enrich import enrich_release_dates
     ensure_data_dir()
-    n_ok, n_total = enrich_release_dates()
-    print(f"Fechas encontradas para {n_ok}/{n_total} lanzamientos. Archivo: data/collection.enriched.json")
+    n_ok, n_total = enrich_release_dates(max_workers=concurrency, incremental=incremental, race=race, engine=engine)
+    dest = store.DB_PATH if store.active() else store.ENRICHED_JSON
+    print(f"Fechas encontradas para {n_ok}/{n_total} lanzamientos. Archivo: {dest}")
 
-def cmd_anniv():
-    ensure_data_dir()
-    print("[anniversaries] Leyendo data/collection.enriched.json …")
-    data = load_json("data/collection.enriched.json")
+def _load_index(start, end):
+    print(f"[anniversaries] Leyendo {store.DB_PATH if store.active() else store.ENRICHED_JSON} …")
+    data = store.load_dated(start, end)
     if not data:
         print("Primero ejecuta: python app.py enrich")
-        return
-    rows = upcoming_anniversaries(data, days_ahead=7, include_partial=False)
-    if not rows:
-        print("No hay aniversarios en los próximos 7 días.")
-        return
-    print("Aniversarios próximos (7 días):")
+        return None
+    return AnniversaryIndex(data, include_partial=False)
+
+def _print_rows(rows):
     for r in rows:
         src = f" · fuente: {r['release_source']}" if r.get("release_source") else ""
         print(f"- {r['artist_clean']} — {r['title']} | Lanzamiento: {r['release_date']} | Día: {r['next_anniv_date']}{src}")
 
+def cmd_anniv(days=7):
+    ensure_data_dir()
+    today = datetime.date.today()
+    idx = _load_index(today, today + datetime.timedelta(days=days))
+    if idx is None:
+        return
+    rows = idx.upcoming(days_ahead=days, today=today)
+    if not rows:
+        print(f"No hay aniversarios en los próximos {days} días.")
+        return
+    print(f"Aniversarios próximos ({days} días):")
+    _print_rows(rows)
+
+def cmd_month(month=None):
+    ensure_data_dir()
+    today = datetime.date.today()
+    first = datetime.date(today.year, month or today.month, 1)
+    last = datetime.date(first.year + (first.month == 12), first.month % 12 + 1, 1) - datetime.timedelta(days=1)
+    idx = _load_index(first, last)
+    if idx is None:
+        return
+    rows = idx.month(month, today=today)
+    name = f"{month:02d}" if month else "este mes"
+    if not rows:
+        print(f"No hay aniversarios en {name}.")
+        return
+    print(f"Aniversarios de {name}:")
+    _print_rows(rows)
+
+
+def cmd_store(action):
+    ensure_data_dir()
+    if action == "export" and not store.active():
+        # get_store() crearía un almacén vacío y la exportación vaciaría los JSON
+        print(f"No hay almacén en {store.DB_PATH}: nada que exportar. Se crea con: python app.py store-import")
+        return
+    db = store.get_store()
+    if action == "import":
+        n_raw, n_enr, n_ovr = db.import_json()
+        print(f"OK. Importados {n_raw} raw, {n_enr} enriquecidos y {n_ovr} overrides en {store.DB_PATH}")
+    else:
+        n_raw, n_enr = db.export_json()
+        print(f"OK. Exportados {n_raw} raw y {n_enr} enriquecidos a data/*.json")
+
+def cmd_stats(export=None):
+    snap = metrics.load()
+    if snap is None:
+        print("No hay métricas todavía. Se generan al ejecutar enrich o retry-missing.")
+        return
+    if export:
+        if export == "-":
+            print(json.dumps(snap, ensure_ascii=False, indent=2))
+        else:
+            save_json(snap, export)
+            print(f"OK. Métricas exportadas a {export}")
+        return
+    secs = snap["finished"] - snap["started"]
+    print(f"[stats] Última ejecución: {snap['run']} · {snap.get('items', 0)} ítems · "
+          f"{snap.get('found', 0)} con fecha · {secs:.0f} s")
+    print(metrics.format_table(snap))
+    print(f"Historial completo (una línea JSON por ejecución): {metrics.HISTORY_JSONL}")
+
+def cmd_mb_import(path):
+    if not path:
+        raise SystemExit("mb-import: indica el volcado con --dump RUTA (release.tar.xz, .jsonl, .jsonl.gz, ...)")
+    import mb_dump
+    ensure_data_dir()
+    n_rel, n_rg = mb_dump.DumpIndex().import_dump(path)
+    print(f"OK. {n_rel} releases y {n_rg} release-groups importados en {mb_dump.DB_PATH}")
+
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Discogs anniversaries")
-    ap.add_argument("command", choices=["update", "enrich", "anniversaries", "month", "retry-missing", "all"], help="Qué quieres ejecutar")
+    ap.add_argument("command", choices=["update", "enrich", "anniversaries", "month", "retry-missing", "all", "store-import", "store-export", "stats", "mb-import"], help="Qué quieres ejecutar")
+    ap.add_argument("--incremental", action="store_true", help="update: sólo altas/bajas desde la última sync; enrich: sólo ítems nuevos")
+    ap.add_argument("--race", action="store_true", help="enrich: consulta todas las fuentes en paralelo; gana la primera fecha completa")
+    ap.add_argument("--engine", choices=["threads", "asyncio"], default="threads",
+                    help="enrich: motor de concurrencia (asyncio: HTTP asíncrono con aiohttp)")
+    ap.add_argument("--concurrency", type=int, help="enrich: ítems en vuelo (por defecto 12 con threads, 200 con asyncio)")
+    ap.add_argument("--days", type=int, default=7, help="anniversaries: ventana en días")
+    ap.add_argument("--month", type=int, choices=range(1, 13), metavar="MM", help="month: mes a listar (por defecto el actual)")
+    ap.add_argument("--limit", type=int, help="retry-missing: máximo de ítems a reintentar en esta ejecución")
+    ap.add_argument("--json", metavar="RUTA", help="stats: exporta la última ejecución como JSON (- = stdout)")
+    ap.add_argument("--dump", metavar="RUTA", help="mb-import: volcado JSON de MusicBrainz (o un subconjunto)")
+    ap.add_argument("--workers", type=int, default=4, help="Páginas de Discogs descargadas en paralelo (update)")
 
     args = ap.parse_args()
 
     if args.command == "update":
-        cmd_update()
+        cmd_update(args.workers, args.incremental)
     elif args.command == "enrich":
-        cmd_enrich()
+        cmd_enrich(args.incremental, args.race, args.engine, args.concurrency)
     elif args.command == "retry-missing":
+        from enrich import enrich_missing_only
         ensure_data_dir()
         print("[retry-missing] Reintentando sólo los que no tienen fecha…")
-        n_new, total = enrich_missing_only()
+        n_new, total = enrich_missing_only(limit=args.limit)
         print(f"Nuevas fechas encontradas: {n_new}. Total items: {total}")        
     elif args.command == "anniversaries":
-        cmd_anniv()
+        cmd_anniv(args.days)
+    elif args.command == "month":
+        cmd_month(args.month)
+    elif args.command in ("store-import", "store-export"):
+        cmd_store(args.command.split("-")[1])
+    elif args.command == "stats":
+        cmd_stats(args.json)
+    elif args.command == "mb-import":
+        cmd_mb_import(args.dump)
     elif args.command == "all":
-        cmd_update()
-        cmd_enrich()
-        cmd_anniv()
+        cmd_update(args.workers, args.incremental)
+        cmd_enrich(args.incremental, args.race, args.engine, args.concurrency)
+        cmd_anniv(args.days)
@@ -0,0 +1,198 @@
+"""
+Servicio HTTP de aniversarios. Carga el enriquecido una vez en un AnniversaryIndex y
+responde desde memoria:
+
+  GET /anniversaries?days=N   próximos N días (por defecto 7, máximo 366)
+  GET /month/MM               aniversarios del mes MM de este año
+  GET /on/MM-DD               aniversarios de ese día de este año
+
+Las respuestas llevan ETag y se contesta 304 a If-None-Match. Las del día en curso se
+calculan al cargar; el resto se memoriza la primera vez que se piden. Un hilo vigila
+el almacén (data/collection.sqlite o data/collection.enriched.json) y, si cambia o
+cambia el día, construye un índice nuevo y lo sustituye de golpe.
+
+Uso:
+  python app_web.py --port 8080
+"""
+import os, json, time, hashlib, argparse, datetime, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from utils import AnniversaryIndex
+import store
+
+POLL_SECONDS = float(os.getenv("ANNIV_WEB_POLL", "2"))
+DEFAULT_DAYS = 7
+MAX_DAYS = 366
+
+
+def _source_signature():
+    """Qué archivo se lee y su versión (mtime, tamaño); cambia cuando se reescribe el enriquecido."""
+    paths = [store.DB_PATH, store.DB_PATH + "-wal"] if store.active() else [store.ENRICHED_JSON]
+    sig = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            sig.append((p, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append((p, None, None))
+    return tuple(sig)
+
+
+class Response:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+
+class Snapshot:
+    """Índice + respuestas de un estado concreto del almacén y de un día concreto."""
+
+    def __init__(self, data, signature, today=None):
+        self.index = AnniversaryIndex(data, include_partial=False)
+        self.signature = signature
+        self.today = today or datetime.date.today()
+        self.loaded_at = time.time()
+        self.responses = {}
+        self.lock = threading.Lock()
+        # lo que piden los paneles cada pocos segundos, ya listo
+        self.get(("anniversaries", DEFAULT_DAYS))
+        self.get(("month", self.today.month))
+        self.get(("on", self.today.month, self.today.day))
+
+    def _payload(self, key):
+        kind = key[0]
+        if kind == "anniversaries":
+            rows = self.index.upcoming(days_ahead=key[1], today=self.today)
+            return {"today": self.today.isoformat(), "days": key[1], "count": len(rows), "items": rows}
+        if kind == "month":
+            rows = self.index.month(key[1], year=self.today.year, today=self.today)
+            return {"today": self.today.isoformat(), "month": key[1], "count": len(rows), "items": rows}
+        day = datetime.date(self.today.year, key[1], key[2])
+        rows = self.index.between(day, day, today=self.today)
+        return {"today": self.today.isoformat(), "on": day.isoformat(), "count": len(rows), "items": rows}
+
+    def get(self, key):
+        resp = self.responses.get(key)
+        if resp is None:
+            resp = Response(self._payload(key))
+            with self.lock:
+                resp = self.responses.setdefault(key, resp)
+        return resp
+
+
+class AnniversaryService:
+    def __init__(self, poll=POLL_SECONDS):
+        self.poll = poll
+        self.snapshot = None
+        self.reload_lock = threading.Lock()
+        self.stop = threading.Event()
+        self.reload()
+
+    def reload(self, force=False):
+        """Reconstruye el índice si cambió el almacén o el día. Devuelve True si lo sustituyó."""
+        with self.reload_lock:
+            sig, today = _source_signature(), datetime.date.today()
+            cur = self.snapshot
+            if not force and cur is not None and cur.signature == sig and cur.today == today:
+                return False
+            try:
+                data = store.load_dated() or []   # con el almacén, sólo las filas con fecha completa
+            except (OSError, ValueError) as e:
+                # a mitad de una escritura externa: seguimos con el índice anterior
+                print(f"[web] no se pudo recargar: {e}")
+                return False
+            self.snapshot = Snapshot(data, sig, today)   # asignación atómica: las peticiones en curso
+            print(f"[web] índice cargado: {len(self.snapshot.index)} lanzamientos con fecha completa")
+            return True
+
+    def watch(self):
+        while not self.stop.wait(self.poll):
+            try:
+                self.reload()
+            except Exception as e:   # el vigilante no debe morir por un fallo puntual
+                print(f"[web] error recargando: {e}")
+
+    def route(self, path, query):
+        """(status, Response | None, mensaje de error)"""
+        snap = self.snapshot                # la misma instantánea durante toda la petición
+        parts = [p for p in path.split("/") if p]
+        try:
+            if parts == ["anniversaries"]:
+                days = int(query.get("days", [DEFAULT_DAYS])[0])
+                if not 0 <= days <= MAX_DAYS:
+                    return 400, None, f"days debe estar entre 0 y {MAX_DAYS}"
+                return 200, snap.get(("anniversaries", days)), None
+            if len(parts) == 2 and parts[0] == "month":
+                month = int(parts[1])
+                if not 1 <= month <= 12:
+                    return 400, None, "mes fuera de rango (01-12)"
+                return 200, snap.get(("month", month)), None
+            if len(parts) == 2 and parts[0] == "on":
+                mm, dd = (int(x) for x in parts[1].split("-"))
+                try:
+                    datetime.date(snap.today.year, mm, dd)
+                except ValueError:
+                    if (mm, dd) == (2, 29):
+                        return 404, None, "29 de febrero no existe este año: esos aniversarios están en /on/02-28"
+                    return 400, None, "fecha inválida (MM-DD)"
+                return 200, snap.get(("on", mm, dd)), None
+        except ValueError:
+            return 400, None, "parámetro inválido"
+        return 404, None, "no encontrado"
+
+    def handler(self):
+        svc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body and self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                status, resp, error = svc.route(url.path, parse_qs(url.query))
+                if resp is None:
+                    body = json.dumps({"error": error}, ensure_ascii=False).encode("utf-8")
+                    return self._send(status, body, [("Content-Type", "application/json; charset=utf-8")])
+                headers = [("ETag", resp.etag), ("Cache-Control", "no-cache")]
+                inm = self.headers.get("If-None-Match")
+                if inm and (inm.strip() == "*" or resp.etag in [t.strip() for t in inm.split(",")]):
+                    return self._send(304, headers=headers)
+                self._send(200, resp.body, headers + [("Content-Type", "application/json; charset=utf-8")])
+
+            do_HEAD = do_GET
+
+        return Handler
+
+    def serve(self, host="127.0.0.1", port=8080):
+        threading.Thread(target=self.watch, daemon=True).start()
+        httpd = ThreadingHTTPServer((host, port), self.handler())
+        httpd.daemon_threads = True
+        print(f"[web] escuchando en http://{host}:{port}")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop.set()
+            httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Servicio HTTP de aniversarios")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    args = ap.parse_args()
+    AnniversaryService().serve(args.host, args.port)
@@ -0,0 +1,30 @@
+import asyncio
+import anet
+
+# Motor asyncio del enriquecimiento: cada ítem es una corrutina (cientos en vuelo) y las
+# fuentes hacen sus peticiones con anet (aiohttp), así que esperar red no ocupa un hilo
+# por ítem. Lo que de verdad limita cuántas peticiones salen a cada host son los
+# presupuestos por host de throttle.py (AsyncHostScheduler).
+
+
+async def _run(items, worker, emit, concurrency, prefetch):
+    async with anet.session(limit=concurrency):
+        # las búsquedas por lotes se lanzan antes que los ítems: piden turno primero
+        pre = [asyncio.ensure_future(anet.run(steps)) for steps in prefetch]
+        todo = iter(items)
+
+        async def consume():
+            for it in todo:   # iterador compartido: cada consumidor toma el siguiente ítem libre
+                emit(*await worker(it))
+
+        await asyncio.gather(*(consume() for _ in range(concurrency)))
+        await asyncio.gather(*pre, return_exceptions=True)
+
+
+def run_items(items, worker, emit, concurrency=200, prefetch=()):
+    """
+    Ejecuta `await worker(it) -> (row, ok)` para cada ítem con `concurrency` ítems en
+    vuelo y llama a emit(row, ok) según van terminando (en orden de llegada). `prefetch` son
+    generadores de fuentes (p.ej. musicbrainz_prefetch.steps(...)) que corren a la vez.
+    """
+    asyncio.run(_run(items, worker, emit, max(1, concurrency), list(prefetch)))
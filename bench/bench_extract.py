@@ -0,0 +1,156 @@
+"""
+Benchmark de extracción HTML: BeautifulSoup de página completa (implementación anterior)
+vs extract.py (fragmento + lxml). Comprueba que ambos devuelven lo mismo y mide
+tiempo de parseo y pico de memoria (tracemalloc) por página.
+
+Uso:
+  python bench/bench_extract.py                       # usa bench/fixtures/*.html
+  python bench/bench_extract.py --record wikipedia URL  # guarda una página real como fixture
+
+Los fixtures se nombran <tipo>_<nombre>.html con tipo en: wikipedia, ma_album, ma_disc, bandcamp.
+Si no hay fixtures grabados se generan páginas sintéticas con la misma estructura.
+"""
+import os, re, sys, glob, time, tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bs4 import BeautifulSoup
+import extract
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+KINDS = ("wikipedia", "ma_album", "ma_disc", "bandcamp")
+
+
+# ---------- implementación anterior (BeautifulSoup sobre la página entera) ----------
+def old_wikipedia(page):
+    soup = BeautifulSoup(page, "lxml")
+    h1 = soup.select_one("#firstHeading")
+    title = h1.get_text(strip=True) if h1 else None
+    infobox = soup.select_one(".infobox")
+    if not infobox:
+        return title, None
+    for lab in infobox.select("tr th"):
+        if lab.get_text(strip=True).lower() in {"released", "release date"}:
+            val = lab.find_next("td")
+            if not val:
+                continue
+            for sup in val.select("sup"):
+                sup.decompose()
+            return title, val.get_text(" ", strip=True).split(";")[0]
+    return title, None
+
+def old_ma_disc(page):
+    soup = BeautifulSoup(page, "lxml")
+    rows = []
+    for tr in soup.select("table.display tbody tr"):
+        cols = tr.find_all("td")
+        if len(cols) >= 1:
+            a = cols[0].find("a")
+            if not a:
+                continue
+            year = cols[2].get_text(strip=True) if len(cols) >= 3 else None
+            rows.append((a.get_text(strip=True), a.get("href"), year))
+    return rows
+
+def old_ma_album(page):
+    soup = BeautifulSoup(page, "lxml")
+    for row in soup.select("#album_info dt"):
+        if row.get_text(strip=True).lower().startswith("release date"):
+            dd = row.find_next_sibling("dd")
+            return dd.get_text(" ", strip=True) if dd else None
+    return None
+
+def old_bandcamp(page):
+    soup = BeautifulSoup(page, "lxml")
+    tag = soup.find("meta", attrs={"itemprop": "datePublished"}) or \
+          soup.find("meta", attrs={"property": "music:release_date"}) or \
+          soup.find("meta", attrs={"property": "og:release_date"})
+    meta = tag.get("content") if tag else None
+    m = re.search(r"\b([A-Z][a-z]+ \d{1,2}, \d{4}|\d{4}-\d{2}-\d{2})\b", soup.get_text(" ", strip=True))
+    return meta, m.group(1) if m else None
+
+def new_bandcamp(page):
+    meta = extract.bandcamp_meta_date(page)
+    m = re.search(r"\b([A-Z][a-z]+ \d{1,2}, \d{4}|\d{4}-\d{2}-\d{2})\b", extract.page_text(page))
+    return meta, m.group(1) if m else None
+
+PAIRS = {
+    "wikipedia": (old_wikipedia, extract.wikipedia_title_and_released),
+    "ma_disc":   (old_ma_disc, extract.ma_discography_rows),
+    "ma_album":  (old_ma_album, extract.ma_release_date_text),
+    "bandcamp":  (old_bandcamp, new_bandcamp),
+}
+
+
+# ---------- páginas sintéticas (si no hay fixtures grabados) ----------
+def _filler(n):
+    return "".join(f"<p>Paragraph {i} with <a href='/wiki/X{i}'>a link</a> and <b>some</b> text.</p>\n"
+                   for i in range(n))
+
+def synthetic():
+    wiki = ("<html><head><title>Irreligious - Wikipedia</title></head><body>"
+            "<h1 id=\"firstHeading\" class=\"firstHeading\"><i>Irreligious</i></h1>"
+            "<table class=\"infobox vevent haudio\"><tbody>"
+            "<tr><th colspan=\"2\">Irreligious</th></tr>"
+            "<tr><th scope=\"row\">Released</th><td>29 July 1996<sup>[1]</sup>; 1997 (US)</td></tr>"
+            "<tr><th scope=\"row\">Genre</th><td>Gothic metal</td></tr>"
+            "</tbody></table>" + _filler(3000) + "</body></html>")
+    rows = "".join(f"<tr><td><a href=\"https://www.metal-archives.com/albums/B/A{i}/{i}\">Album {i}</a></td>"
+                   f"<td>Full-length</td><td>{1990 + i % 30}</td><td>5 (80%)</td></tr>" for i in range(200))
+    disc = f"<table class=\"display discog\"><thead><tr><th>Name</th></tr></thead><tbody>{rows}</tbody></table>"
+    album = ("<html><body>" + _filler(800) + "<div id=\"album_info\"><h2>Irreligious</h2>"
+             "<dl class=\"float_left\"><dt>Type:</dt><dd>Full-length</dd>"
+             "<dt>Release date:</dt><dd>July 29th, 1996</dd></dl></div>" + _filler(800) + "</body></html>")
+    bandcamp = ("<html><head><meta property=\"og:title\" content=\"X\">"
+                "<meta itemprop=\"datePublished\" content=\"2016-08-19\"></head><body>"
+                "<script>var x = 'March 3, 2001';</script>" + _filler(1500) +
+                "<div class=\"tralbumData\">released August 19, 2016</div></body></html>")
+    return [("wikipedia", "synthetic", wiki), ("ma_disc", "synthetic", disc),
+            ("ma_album", "synthetic", album), ("bandcamp", "synthetic", bandcamp)]
+
+
+def fixtures():
+    out = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        base = os.path.basename(path)[:-5]
+        kind = next((k for k in KINDS if base.startswith(k + "_")), None)
+        if kind:
+            with open(path, encoding="utf-8") as f:
+                out.append((kind, base, f.read()))
+    return out or synthetic()
+
+
+def measure(fn, page, reps=5):
+    tracemalloc.start()
+    fn(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t = time.perf_counter()
+    for _ in range(reps):
+        res = fn(page)
+    return res, (time.perf_counter() - t) / reps, peak
+
+
+def record(kind, url):
+    import net
+    r = net.GET(url, headers={"User-Agent": "discogs-anniv-bot/1.1"})
+    r.raise_for_status()
+    os.makedirs(FIXTURES, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", url.split("//", 1)[-1]).strip("_")[:60]
+    path = os.path.join(FIXTURES, f"{kind}_{name}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(r.text)
+    print("guardado", path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--record":
+        record(sys.argv[2], sys.argv[3])
+        raise SystemExit
+    for kind, name, page in fixtures():
+        old_fn, new_fn = PAIRS[kind]
+        a, t_old, m_old = measure(old_fn, page)
+        b, t_new, m_new = measure(new_fn, page)
+        assert a == b, f"{name}: resultados distintos\n  antes: {a!r}\n  ahora: {b!r}"
+        print(f"{kind:<10} {name[:30]:<30} {len(page)/1024:7.0f} KiB  "
+              f"{t_old*1000:7.1f} ms -> {t_new*1000:6.1f} ms (x{t_old/max(t_new, 1e-9):.1f})  "
+              f"pico {m_old/1024:7.0f} KiB -> {m_new/1024:6.0f} KiB")
@@ -0,0 +1,66 @@
+"""
+Micro-benchmark del matching: bucle par a par original vs matching.best_match.
+Uso: python bench/bench_matching.py [n_discografia ...]
+"""
+import os, re, sys, time, random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rapidfuzz import fuzz
+from unidecode import unidecode
+import matching
+
+WORDS = ("black dark night blood death fire winter storm throne frost eternal "
+         "funeral moon shadow grave lord chaos kingdom north wolves spirit").split()
+
+
+def _canon_old(s):
+    s = unidecode((s or "").lower())
+    s = re.sub(r"[^a-z0-9]+", " ", s)
+    return " ".join(s.split())
+
+def _score_old(a, b):
+    A, B = _canon_old(a), _canon_old(b)
+    return max(fuzz.token_set_ratio(A, B), fuzz.partial_ratio(A, B))
+
+def best_old(query, choices):
+    best_i, best = None, -1
+    for i, c in enumerate(choices):
+        sc = _score_old(c, query)
+        if sc > best:
+            best_i, best = i, sc
+    return best_i, best
+
+
+def discography(n, rnd):
+    return [" ".join(rnd.choice(WORDS).title() for _ in range(rnd.randint(1, 4))) +
+            rnd.choice(["", " (Live)", " - Demo", " / Split", " (Remastered)"])
+            for _ in range(n)]
+
+
+def run(n, queries=20, cutoff=75):
+    rnd = random.Random(n)
+    disc = discography(n, rnd)
+    qs = [rnd.choice(disc) if i % 2 else discography(1, rnd)[0] for i in range(queries)]
+
+    t = time.perf_counter()
+    old = [best_old(q, disc) for q in qs]
+    t_old = time.perf_counter() - t
+
+    matching.canon.cache_clear()
+    t = time.perf_counter()
+    new = [matching.best_match(q, disc) for q in qs]
+    t_new = time.perf_counter() - t
+
+    t = time.perf_counter()
+    [matching.best_match(q, disc, cutoff=cutoff) for q in qs]
+    t_cut = time.perf_counter() - t
+
+    assert old == new, "las puntuaciones no coinciden"
+    print(f"n={n:>6}  par a par {t_old*1000:8.1f} ms   lotes {t_new*1000:8.1f} ms "
+          f"(x{t_old/max(t_new, 1e-9):.1f})   lotes+cutoff {t_cut*1000:8.1f} ms (x{t_old/max(t_cut, 1e-9):.1f})")
+
+
+if __name__ == "__main__":
+    sizes = [int(x) for x in sys.argv[1:]] or [50, 500, 5000]
+    for n in sizes:
+        run(n)
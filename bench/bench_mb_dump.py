@@ -0,0 +1,61 @@
+"""
+Importa el volcado de ejemplo (bench/fixtures/musicbrainz/release.jsonl) en un data/
+temporal, comprueba lo que devuelven las fuentes de MusicBrainz con el índice local
+(y que no hacen ninguna petición) y mide el tiempo por consulta.
+Uso: python bench/bench_mb_dump.py [volcado] [repeticiones]
+"""
+import os, sys, time, shutil, tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+FIXTURE = os.path.join(HERE, "fixtures", "musicbrainz", "release.jsonl")
+
+# (artista, título) -> fecha esperada de musicbrainz_release_date / musicbrainz_label_event_date
+EXPECTED = {
+    ("Emperor", "In the Nightside Eclipse"): ("1994-02-21", "1994-02-21"),
+    ("Darkthrone", "Transilvanian Hunger"): ("1994-02", "1994-02-17"),
+    ("Burzum", "Hvis lyset tar oss"): (None, "1994-04-01"),
+    ("Ulver", "Split"): ("2001-11-05", "2001-11-05"),
+    ("Ulver / Mayhem", "Split"): ("2001-11-05", "2001-11-05"),
+    ("Kvelertåk", "Bla Himmel"): ("2003", "2003"),
+}
+
+
+def run(dump, reps):
+    import mb_dump, net, sources
+
+    t = time.perf_counter()
+    n_rel, n_rg = mb_dump.DumpIndex().import_dump(dump)
+    print(f"importados {n_rel} releases y {n_rg} release-groups en {(time.perf_counter() - t) * 1000:.1f} ms")
+
+    before = net.requests_made()
+    for (artist, title), (want_rel, want_ev) in EXPECTED.items() if dump == FIXTURE else ():
+        got_rel = sources.musicbrainz_release_date(artist, title)
+        got_ev = sources.musicbrainz_label_event_date(artist, title)
+        assert (got_rel and got_rel[0]) == want_rel, (artist, title, got_rel)
+        assert (got_ev and got_ev[0]) == want_ev, (artist, title, got_ev)
+        assert got_ev[3]["rg_mbid"], got_ev
+    if dump == FIXTURE:
+        got = sources.musicbrainz_pinned_date("c0000006-0000-4000-8000-000000000001")
+        assert got[0] == "1993-11-01", got
+    assert net.requests_made() == before, "el índice local no debería hacer peticiones"
+
+    idx = mb_dump.get_index()
+    keys = list(EXPECTED) + [("Emperor", "No existe")]
+    t = time.perf_counter()
+    for _ in range(reps):
+        for artist, title in keys:
+            idx.releases(artist, title)
+    per = (time.perf_counter() - t) / (reps * len(keys))
+    print(f"consulta local: {per * 1e6:.1f} µs ({reps * len(keys)} consultas, 0 peticiones)")
+
+
+if __name__ == "__main__":
+    dump = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else FIXTURE
+    reps = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    work = tempfile.mkdtemp(prefix="anniv-mbdump-")
+    os.chdir(work)   # data/ relativo: cachés e índice del benchmark, no los reales
+    try:
+        run(dump, reps)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
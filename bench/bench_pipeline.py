@@ -0,0 +1,207 @@
+"""
+Benchmark del pipeline completo contra servicios simulados (bench/fake_services.py),
+sin tocar la red ni los datos reales.
+
+Para cada tamaño de colección se crea un directorio de trabajo temporal con su propio
+data/ (cachés, almacenes y JSON) y cada etapa corre en un subproceso aparte para que el
+pico de RSS sea el suyo:
+  fetch   -> discogs_client.fetch_collection
+  enrich  -> enrich.enrich_release_dates
+  retry   -> enrich.enrich_missing_only (ANNIV_MISS_TTL_DAYS=0: reintenta todo lo que faltó)
+  anniv   -> utils.upcoming_anniversaries (repetido, sobre el enriched resultante)
+
+Por etapa se informa: ítems/s, peticiones por ítem (contadas por el servidor),
+latencia p50/p95 (por ítem en enrich/retry, por página en fetch, por llamada en anniv)
+y pico de RSS.
+
+Uso:
+  python bench/bench_pipeline.py                              # 384 y 10k ítems
+  python bench/bench_pipeline.py --sizes 384,10k,100k --latency 30 --errors 0.01 --r429 0.005
+  python bench/bench_pipeline.py --limits real                # con los límites por host reales
+  python bench/bench_pipeline.py --engine asyncio --json bench_output.json
+
+Las colecciones sintéticas usan data/collection.raw.json como plantilla (si existe).
+"""
+import os, sys, json, time, shutil, inspect, tempfile, subprocess
+from urllib.request import urlopen
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+STAGES = ("fetch", "enrich", "retry", "anniv")
+
+
+def _size(s):
+    s = s.strip().lower()
+    return int(float(s[:-1]) * 1000) if s.endswith("k") else int(s)
+
+
+def _pct(samples, q):
+    if not samples:
+        return None
+    xs = sorted(samples)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+def _peak_rss_kib():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KiB en Linux
+
+
+# ---------- etapas (se ejecutan dentro del subproceso, con cwd = directorio de trabajo) ----------
+def _timed(module, name, samples):
+    """Envuelve module.name (función o corrutina) para medir la duración de cada llamada."""
+    fn = getattr(module, name)
+    if inspect.iscoroutinefunction(fn):
+        async def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - t)
+    else:
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - t)
+    setattr(module, name, wrapper)
+
+
+def _lift_limits():
+    from throttle import SCHEDULER, HOST_LIMITS
+    for host in HOST_LIMITS:
+        SCHEDULER.configure(host, rate=None, concurrency=64)
+
+
+def run_stage(stage, opts):
+    sys.path.insert(0, ROOT)
+    samples = []
+    if opts.get("limits") != "real":
+        _lift_limits()
+    t = time.perf_counter()
+    if stage == "fetch":
+        import discogs_client
+        _timed(discogs_client, "_get_paced", samples)
+        items = discogs_client.fetch_collection(workers=opts.get("workers", 4))
+    elif stage == "enrich":
+        import enrich
+        _timed(enrich, "find_release_date", samples)
+        _timed(enrich, "find_release_date_async", samples)
+        _, items = enrich.enrich_release_dates(max_workers=opts.get("concurrency"), engine=opts.get("engine", "threads"))
+    elif stage == "retry":
+        import enrich
+        _timed(enrich, "find_release_date", samples)
+        enrich.enrich_missing_only()
+        items = len(samples)
+    elif stage == "anniv":
+        from utils import load_json, upcoming_anniversaries
+        import store
+        data = store.load_enriched() or load_json("data/collection.enriched.json") or []
+        t = time.perf_counter()
+        reps = opts.get("reps", 20)
+        for _ in range(reps):
+            s = time.perf_counter()
+            upcoming_anniversaries(data, days_ahead=30)
+            samples.append(time.perf_counter() - s)
+        items = len(data) * reps
+    else:
+        raise SystemExit(f"etapa desconocida: {stage}")
+    secs = time.perf_counter() - t
+    return {"stage": stage, "items": items, "seconds": secs,
+            "p50_ms": None if not samples else _pct(samples, 0.5) * 1000,
+            "p95_ms": None if not samples else _pct(samples, 0.95) * 1000,
+            "peak_rss_kib": _peak_rss_kib()}
+
+
+# ---------- orquestación ----------
+def _server_stats(url):
+    with urlopen(url + "/__stats") as r:
+        return json.load(r)
+
+
+def bench_size(n, args):
+    from fake_services import FakeServices, synthetic_releases
+    releases = synthetic_releases(n, os.path.join(ROOT, "data", "collection.raw.json"))
+    svc = FakeServices(releases, latency_ms=args.latency, error_rate=args.errors,
+                       rate_429=args.r429, retry_after=args.retry_after).start()
+    work = tempfile.mkdtemp(prefix=f"anniv-bench-{n}-")
+    os.makedirs(os.path.join(work, "data"))
+    env = {**os.environ, "PYTHONPATH": ROOT, "ANNIV_REDIRECT": svc.url,
+           "DISCOGS_API_BASE": f"{svc.url}/api.discogs.com",
+           "DISCOGS_USERNAME": "bench", "DISCOGS_TOKEN": "bench", "TQDM_DISABLE": "1",
+           # sin back-off de fallos: retry-missing vuelve a intentar todo lo que enrich no encontró
+           "ANNIV_MISS_TTL_DAYS": "0"}
+    opts = {"limits": args.limits, "engine": args.engine, "concurrency": args.concurrency}
+    results = []
+    try:
+        for stage in STAGES:
+            if stage not in args.stages and stage != "fetch":
+                continue
+            before = _server_stats(svc.url).get("requests", 0)
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--stage", stage,
+                                   "--opts", json.dumps(opts)],
+                                  cwd=work, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                raise SystemExit(f"falló la etapa {stage} con {n} ítems")
+            res = json.loads(proc.stdout.strip().splitlines()[-1])
+            res["requests"] = _server_stats(svc.url).get("requests", 0) - before
+            res["size"] = n
+            if stage in args.stages:
+                results.append(res)
+                _print_row(res)
+    finally:
+        svc.stop()
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def _fmt(v, spec):
+    return "-" if v is None else format(v, spec)
+
+
+def _print_row(r):
+    per_item = r["requests"] / r["items"] if r["items"] else None
+    rate = r["items"] / r["seconds"] if r["seconds"] else None
+    print(f"{r['size']:>7} {r['stage']:<7} {r['items']:>8} {_fmt(rate, '>10.1f')} {_fmt(per_item, '>8.2f')} "
+          f"{_fmt(r['p50_ms'], '>9.1f')} {_fmt(r['p95_ms'], '>9.1f')} {r['peak_rss_kib'] / 1024:>9.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Benchmark offline del pipeline")
+    ap.add_argument("--sizes", default="384,10k", help="tamaños de colección, p.ej. 384,10k,100k")
+    ap.add_argument("--stages", default=",".join(STAGES), help="etapas a medir (fetch siempre se ejecuta)")
+    ap.add_argument("--latency", type=float, default=20.0, help="latencia media simulada por petición (ms)")
+    ap.add_argument("--errors", type=float, default=0.0, help="fracción de respuestas 500")
+    ap.add_argument("--r429", type=float, default=0.0, help="fracción de respuestas 429")
+    ap.add_argument("--retry-after", type=int, default=1, help="Retry-After de los 429 inyectados (s)")
+    ap.add_argument("--limits", choices=["off", "real"], default="off",
+                    help="off: sin límites por host (mide el pipeline); real: los de throttle.py")
+    ap.add_argument("--engine", choices=["threads", "asyncio"], default="threads")
+    ap.add_argument("--concurrency", type=int, help="ítems en vuelo en enrich")
+    ap.add_argument("--json", metavar="RUTA", help="guarda los resultados como JSON")
+    ap.add_argument("--stage", help=argparse.SUPPRESS)
+    ap.add_argument("--opts", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, json.loads(args.opts or "{}"))))
+        raise SystemExit
+
+    args.stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    print(f"latencia {args.latency:g} ms · errores {args.errors:g} · 429 {args.r429:g} · "
+          f"límites {args.limits} · motor {args.engine} · "
+          f"concurrencia {args.concurrency or (200 if args.engine == 'asyncio' else 12)}")
+    print(f"{'tamaño':>7} {'etapa':<7} {'ítems':>8} {'ítems/s':>10} {'pet/ítem':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'RSS MiB':>9}")
+    out = []
+    for n in (_size(s) for s in args.sizes.split(",")):
+        out.extend(bench_size(n, args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ("stage", "opts")},
+                       "results": out}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,47 @@
+"""
+Tiempo de arranque de los comandos de app.py (cada uno en un proceso nuevo, como desde cron)
+y comprobación de que los de sólo lectura no cargan la pila HTTP ni las dependencias pesadas.
+Se resta el arranque del intérprete vacío para ver lo que cuesta la aplicación.
+Uso: python bench/bench_startup.py [repeticiones]
+"""
+import os, sys, time, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ("requests", "requests_cache", "urllib3", "lxml", "bs4", "rapidfuzz", "unidecode",
+         "dateparser", "tqdm", "dotenv", "aiohttp", "net", "anet", "async_engine", "sources", "enrich",
+         "discogs_client")
+
+CASES = [
+    ("python (vacío)", ["-c", "pass"]),
+    ("import app", ["-c", "import app"]),
+    ("app.py anniversaries", ["app.py", "anniversaries"]),
+    ("app.py month", ["app.py", "month"]),
+    ("import enrich", ["-c", "import enrich"]),   # lo que antes se cargaba siempre
+]
+
+
+def _run(args):
+    t = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - t) * 1000
+
+
+def main(reps):
+    out = subprocess.run([sys.executable, "-c", "import sys, app; print(' '.join(sorted(sys.modules)))"],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+    loaded = [m for m in HEAVY if m in out]
+    assert not loaded, f"import app carga módulos pesados: {loaded}"
+
+    base = None
+    print(f"{'caso':<22} {'mediana ms':>10} {'mín ms':>8} {'- intérprete':>13}")
+    for name, args in CASES:
+        _run(args)   # calentar la caché de bytecode y del sistema de archivos
+        xs = sorted(_run(args) for _ in range(reps))
+        med = xs[len(xs) // 2]
+        base = med if base is None else base
+        print(f"{name:<22} {med:>10.1f} {xs[0]:>8.1f} {med - base:>13.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,436 @@
+"""
+Servidor HTTP local que hace de Discogs, MusicBrainz, Wikipedia, Metal Archives y Bandcamp
+para medir el pipeline sin salir a la red.
+
+Las peticiones llegan como /<host original>/<ruta> (ver ANNIV_REDIRECT en net.py y
+DISCOGS_API_BASE en discogs_client.py). Si existe una respuesta grabada en
+bench/fixtures/http/<host>/<sha1 de ruta?query> se sirve tal cual; si no, se sintetiza
+a partir de la colección: cada (artista, título) tiene un perfil determinista que decide
+qué fuentes lo conocen y con qué precisión de fecha.
+
+Se puede inyectar latencia, errores 500 y 429 (con Retry-After) por petición.
+GET /__stats devuelve los contadores; GET /__reset los pone a cero.
+
+Uso suelto:
+  python bench/fake_services.py --port 8765 --latency 30 --errors 0.01 --r429 0.01
+  python bench/fake_services.py --record URL     # graba una respuesta real para replay
+"""
+import os, re, sys, json, time, uuid, zlib, random, hashlib, threading, datetime
+from collections import Counter
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+REPLAY = os.path.join(os.path.dirname(__file__), "fixtures", "http")
+
+
+def replay_path(host, path_qs):
+    return os.path.join(REPLAY, host, hashlib.sha1(path_qs.encode("utf-8")).hexdigest())
+
+
+def _norm(s):
+    return " ".join((s or "").lower().split())
+
+
+def _clean(artist):
+    return re.sub(r"\s*\(\d+\)\s*$", "", artist or "").strip()
+
+
+def _slug(s):
+    return re.sub(r"[^a-z0-9]+", "-", (s or "").lower()).strip("-") or "x"
+
+
+class Catalog:
+    """Índice de la colección sintética y perfil determinista por release."""
+
+    def __init__(self, releases):
+        self.releases = releases          # formato de la API de colección de Discogs
+        self.by_artist = {}               # artista -> {título: perfil}
+        self.by_title = {}                # título -> perfil (búsqueda de Wikipedia)
+        self.by_mbid = {}
+        self.by_slug = {}                 # (slug artista, slug título) -> perfil (Bandcamp)
+        self.by_master = {}               # master_id -> perfil (Discogs)
+        self.by_release = {}              # id de la release original (main_release) -> perfil
+        for rel in releases:
+            b = rel["basic_information"]
+            artist = _clean(b["artists"][0]["name"])
+            p = self.profile(artist, b["title"])
+            p["main_release"] = b["id"] + 5000000 if b.get("master_id") else b["id"]
+            if b.get("master_id"):
+                self.by_master[b["master_id"]] = p
+            self.by_release[p["main_release"]] = p
+            self.by_artist.setdefault(_norm(artist), {})[_norm(b["title"])] = p
+            self.by_title.setdefault(_norm(b["title"]), p)
+            self.by_mbid[p["mbid"]] = p
+            self.by_slug[(_slug(artist), _slug(b["title"]))] = p
+
+    @staticmethod
+    def profile(artist, title):
+        h = zlib.crc32(f"{_norm(artist)}|{_norm(title)}".encode("utf-8"))
+        day = datetime.date(1970, 1, 1) + datetime.timedelta(days=h % 18000)
+        full, ym, y = day.isoformat(), day.isoformat()[:7], day.isoformat()[:4]
+        # qué sabe cada fuente: ~55% MB con fecha completa, ~20% sólo año, resto nada;
+        # Wikipedia, Metal Archives y Bandcamp cubren parte de los huecos
+        mb = (h >> 3) % 20
+        dg = (h >> 17) % 10
+        return {
+            # Discogs: ~60% con 'released' completo, ~20% sólo año ('YYYY-00-00'), resto vacío
+            "discogs_released": full if dg < 6 else (f"{y}-00-00" if dg < 8 else ""),
+            "artist": artist, "title": title,
+            "mbid": str(uuid.UUID(int=h << 64 | h)),
+            "mb_date": full if mb < 11 else (y if mb < 15 else None),
+            "wiki_date": full if (h >> 8) % 4 == 0 else (ym if (h >> 8) % 4 == 1 else None),
+            "ma_date": full if (h >> 11) % 3 == 0 else None,
+            "bandcamp_date": full if (h >> 14) % 5 == 0 else None,
+        }
+
+    # el sufijo " (2)" es cosa de Discogs: las demás fuentes sólo conocen el nombre limpio
+    def lookup(self, artist, title):
+        return self.by_artist.get(_norm(_clean(artist)), {}).get(_norm(title))
+
+    def by_artist_titles(self, artist):
+        return self.by_artist.get(_norm(_clean(artist)), {})
+
+
+def _lucene(field, query):
+    return [v.replace('\\"', '"').replace("\\\\", "\\")
+            for v in re.findall(rf'{field}:"((?:[^"\\]|\\.)*)"', query)]
+
+
+class FakeServices:
+    def __init__(self, releases, port=0, latency_ms=0.0, error_rate=0.0, rate_429=0.0,
+                 retry_after=1, seed=1):
+        self.catalog = Catalog(releases)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def _count(self, *keys):
+        with self.lock:
+            for k in keys:
+                self.stats[k] += 1
+
+    def _draw(self):
+        with self.lock:
+            lat = self.rng.uniform(0.5, 1.5) * self.latency_ms if self.latency_ms else 0.0
+            x = self.rng.random()
+        fault = "429" if x < self.rate_429 else ("500" if x < self.rate_429 + self.error_rate else None)
+        return lat / 1000.0, fault
+
+    # ---------- rutas ----------
+    def route(self, host, path, qs):
+        """(status, content_type, cuerpo str, headers extra)"""
+        q = {k: v[0] for k, v in qs.items()}
+        if host == "api.discogs.com":
+            return self.discogs(path, q)
+        if host == "musicbrainz.org":
+            return self.musicbrainz(path, q)
+        if host.endswith("wikipedia.org"):
+            return self.wikipedia(path, q)
+        if host.endswith("metal-archives.com"):
+            return self.metal_archives(path, q)
+        if host.endswith("bandcamp.com"):
+            return self.bandcamp(host, path)
+        return 404, "text/plain", "not found", {}
+
+    def discogs(self, path, q):
+        m = re.fullmatch(r"/(masters|releases)/(\d+)", path)
+        if m:
+            ids = self.catalog.by_master if m.group(1) == "masters" else self.catalog.by_release
+            p = ids.get(int(m.group(2)))
+            if p is None:
+                return 404, "application/json", json.dumps({"message": "Release not found."}), {}
+            if m.group(1) == "masters":
+                body = {"id": int(m.group(2)), "title": p["title"], "main_release": p["main_release"],
+                        "year": int(p["discogs_released"][:4]) if p["discogs_released"] else 0}
+            else:
+                body = {"id": p["main_release"], "title": p["title"], "released": p["discogs_released"]}
+            return 200, "application/json", json.dumps(body), {
+                "X-Discogs-Ratelimit": "60", "X-Discogs-Ratelimit-Remaining": "59"}
+        per_page = max(1, min(int(q.get("per_page", 50)), 500))
+        page = max(1, int(q.get("page", 1)))
+        rels = self.catalog.releases
+        if q.get("sort") == "added" and q.get("sort_order") == "desc":
+            rels = rels[::-1]
+        pages = max(1, -(-len(rels) // per_page))
+        body = {"pagination": {"page": page, "pages": pages, "per_page": per_page, "items": len(rels)},
+                "releases": rels[(page - 1) * per_page: page * per_page]}
+        return 200, "application/json", json.dumps(body), {
+            "X-Discogs-Ratelimit": "60", "X-Discogs-Ratelimit-Remaining": "59"}
+
+    def _mb_release(self, p):
+        ev = [{"date": p["mb_date"], "area": {"name": "Worldwide"}}] if p["mb_date"] else []
+        return {"id": p["mbid"], "title": p["title"], "date": p["mb_date"] or "",
+                "artist-credit": [{"name": p["artist"]}], "release-events": ev,
+                "release-group": {"id": p["mbid"], "title": p["title"]}}
+
+    def musicbrainz(self, path, q):
+        query = q.get("query", "")
+        if path == "/ws/2/release":
+            artists = _lucene("artist", query)
+            titles = {_norm(t) for t in _lucene("release", query)}
+            known = self.catalog.by_artist_titles(artists[0]) if artists else {}
+            found = [self._mb_release(p) for t, p in known.items() if t in titles]
+            offset, limit = int(q.get("offset", 0)), int(q.get("limit", 25))
+            return 200, "application/json", json.dumps(
+                {"count": len(found), "offset": offset, "releases": found[offset:offset + limit]}), {}
+        if path == "/ws/2/release-group":
+            titles, artists = _lucene("releasegroup", query), _lucene("artist", query)
+            p = self.catalog.lookup(artists[0], titles[0]) if titles and artists else None
+            rgs = [{"id": p["mbid"], "title": p["title"]}] if p else []
+            return 200, "application/json", json.dumps({"count": len(rgs), "release-groups": rgs}), {}
+        m = re.fullmatch(r"/ws/2/release-group/([0-9a-f-]+)", path)
+        if m:
+            p = self.catalog.by_mbid.get(m.group(1))
+            if p is None:
+                return 404, "application/json", json.dumps({"error": "Not Found"}), {}
+            rels = []
+            if p["bandcamp_date"]:
+                url = f"https://{_slug(p['artist'])}.bandcamp.com/album/{_slug(p['title'])}"
+                rels.append({"type": "bandcamp", "url": {"resource": url}})
+            body = {"id": p["mbid"], "title": p["title"], "first-release-date": p["mb_date"] or "", "relations": rels}
+            if "releases" in q.get("inc", ""):
+                body["releases"] = [{"id": p["mbid"], "title": p["title"], "date": p["mb_date"] or ""}]
+            return 200, "application/json", json.dumps(body), {}
+        return 404, "application/json", json.dumps({"error": "Not Found"}), {}
+
+    def wikipedia(self, path, q):
+        if path == "/w/api.php":
+            term = q.get("srsearch", "")
+            title = term[:-len(" (album)")] if term.endswith(" (album)") else term
+            p = self.catalog.by_title.get(_norm(title))
+            hits = [{"title": f"{p['title']} (album)"}] if p and p["wiki_date"] else []
+            return 200, "application/json", json.dumps({"query": {"search": hits}}), {}
+        if path.startswith("/wiki/"):
+            name = unquote(path[len("/wiki/"):]).replace("_", " ")
+            title = name[:-len(" (album)")] if name.endswith(" (album)") else name
+            p = self.catalog.by_title.get(_norm(title))
+            if p and p["wiki_date"]:
+                y, m, *d = (int(x) for x in p["wiki_date"].split("-"))
+                shown = datetime.date(y, m, d[0] if d else 1).strftime("%d %B %Y" if d else "%B %Y").lstrip("0")
+                page = (f"<html><head><title>{name} - Wikipedia</title></head><body>"
+                        f"<h1 id=\"firstHeading\" class=\"firstHeading\"><i>{p['title']}</i></h1>"
+                        "<table class=\"infobox vevent haudio\"><tbody>"
+                        f"<tr><th scope=\"row\">Released</th><td>{shown}<sup>[1]</sup></td></tr>"
+                        "</tbody></table>" + _filler(400) + "</body></html>")
+                return 200, "text/html; charset=utf-8", page, {}
+            return 404, "text/html", "<html><body>No article</body></html>", {}
+        return 404, "text/plain", "not found", {}
+
+    def metal_archives(self, path, q):
+        if path.startswith("/search/ajax-advanced/searching/bands"):
+            name = q.get("bandName", "")
+            titles = self.catalog.by_artist_titles(name)
+            rows = []
+            if any(p["ma_date"] for p in titles.values()):
+                artist = next(iter(titles.values()))["artist"]
+                url = f"https://www.metal-archives.com/bands/{quote(artist, safe='')}/{zlib.crc32(_norm(artist).encode())}"
+                rows.append([f'<a href="{url}">{artist}</a>', "Black Metal", "Norway"])
+            return 200, "application/json", json.dumps({"iTotalRecords": len(rows), "aaData": rows}), {}
+        m = re.fullmatch(r"/band/discography/id/([^/]+)/(\d+)/tab/all", path)
+        if m:
+            titles = self.catalog.by_artist_titles(unquote(m.group(1)))
+            rows = "".join(
+                f"<tr><td><a href=\"https://www.metal-archives.com/albums/{quote(p['artist'], safe='')}/{quote(p['title'], safe='')}/"
+                f"{zlib.crc32(p['mbid'].encode())}\">{p['title']}</a></td><td>Full-length</td>"
+                f"<td>{p['ma_date'][:4]}</td><td></td></tr>"
+                for p in titles.values() if p["ma_date"])
+            page = f"<table class=\"display discog\"><thead><tr><th>Name</th></tr></thead><tbody>{rows}</tbody></table>"
+            return 200, "text/html; charset=utf-8", page, {}
+        m = re.fullmatch(r"/albums/([^/]+)/([^/]+)/\d+", path)
+        if m:
+            p = self.catalog.lookup(unquote(m.group(1)), unquote(m.group(2)))
+            if p and p["ma_date"]:
+                d = datetime.date.fromisoformat(p["ma_date"])
+                page = ("<html><body>" + _filler(200) + f"<div id=\"album_info\"><h2>{p['title']}</h2>"
+                        "<dl class=\"float_left\"><dt>Type:</dt><dd>Full-length</dd>"
+                        f"<dt>Release date:</dt><dd>{d.strftime('%B')} {d.day}th, {d.year}</dd></dl></div>"
+                        "</body></html>")
+                return 200, "text/html; charset=utf-8", page, {}
+        return 404, "text/html", "<html><body>Not found</body></html>", {}
+
+    def bandcamp(self, host, path):
+        m = re.fullmatch(r"/album/([^/]+)", path)
+        artist_slug = host.split(".")[0]
+        p = self.catalog.by_slug.get((artist_slug, m.group(1))) if m else None
+        if p and p["bandcamp_date"]:
+            page = ("<html><head><meta property=\"og:title\" content=\"x\">"
+                    f"<meta itemprop=\"datePublished\" content=\"{p['bandcamp_date']}\"></head><body>"
+                    + _filler(300) + "</body></html>")
+            return 200, "text/html; charset=utf-8", page, {}
+        return 404, "text/html", "<html><body>Not found</body></html>", {}
+
+    # ---------- HTTP ----------
+    def _handler(self):
+        svc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, ctype, body, headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/__stats":
+                    return self._send(200, "application/json", json.dumps(svc.snapshot()))
+                if self.path == "/__reset":
+                    with svc.lock:
+                        svc.stats.clear()
+                    return self._send(200, "application/json", "{}")
+                _, host, rest = self.path.split("/", 2) if self.path.count("/") >= 2 else ("", "", "")
+                parts = urlsplit("/" + rest)
+                family = "bandcamp.com" if host.endswith(".bandcamp.com") else host
+                svc._count("requests", f"requests:{family}")
+                delay, fault = svc._draw()
+                if delay:
+                    time.sleep(delay)
+                if fault == "429":
+                    svc._count("injected_429")
+                    return self._send(429, "text/plain", "slow down", {"Retry-After": str(svc.retry_after)})
+                if fault == "500":
+                    svc._count("injected_500")
+                    return self._send(500, "text/plain", "boom")
+                rec = replay_path(host, "/" + rest)
+                if os.path.exists(rec):
+                    svc._count("replayed")
+                    with open(rec, encoding="utf-8") as f:
+                        meta = json.loads(f.readline())
+                        return self._send(meta["status"], meta["content_type"], f.read())
+                try:
+                    status, ctype, body, headers = svc.route(host, parts.path, parse_qs(parts.query))
+                except Exception as e:  # un fallo del simulador no debe tumbar el servidor
+                    status, ctype, body, headers = 500, "text/plain", repr(e), {}
+                self._send(status, ctype, body, headers)
+
+        return Handler
+
+
+@lru_cache(maxsize=None)
+def _filler(n):
+    return "".join(f"<p>Paragraph {i} with <a href='/wiki/X{i}'>a link</a> and <b>some</b> text.</p>\n"
+                   for i in range(n))
+
+
+# ---------- colecciones sintéticas ----------
+_BUILTIN = [("Emperor", "In the Nightside Eclipse"), ("Taake", "Hordaland Doedskvad"),
+            ("Moonspell", "Irreligious"), ("Darkthrone", "Transilvanian Hunger"),
+            ("Ulver", "Bergtatt"), ("Burzum", "Filosofem"), ("Satyricon", "Nemesis Divina")]
+
+# palabras para títulos sintéticos: tres por título dan 64^3 combinaciones, y títulos que
+# comparten a lo sumo una palabra no pasan los umbrales de fuzzy de sources.py
+_WORDS = ("ash", "blood", "crown", "dawn", "ember", "frost", "grave", "hollow", "iron", "jade",
+          "kingdom", "lantern", "marrow", "night", "oath", "pyre", "quarry", "raven", "serpent",
+          "thorn", "umbra", "veil", "wolf", "xenolith", "yew", "zenith", "abyss", "bane", "cinder",
+          "dusk", "eclipse", "fjord", "glacier", "howl", "idol", "jaws", "kraken", "lament", "mist",
+          "nebula", "obelisk", "plague", "quietus", "rune", "shroud", "tempest", "usurper", "vortex",
+          "wraith", "yearning", "zealot", "altar", "barrow", "chasm", "dirge", "exile", "furnace",
+          "gallows", "harbinger", "inferno", "jackal", "knell", "labyrinth", "monolith")
+
+
+def _title(i):
+    a, b, c = i % 64, (i // 64) % 64, (i // 4096) % 64
+    return " ".join(w.capitalize() for w in (_WORDS[a], _WORDS[b], _WORDS[c]))
+
+
+def synthetic_releases(n, templates_path="data/collection.raw.json"):
+    """
+    n releases con el formato de la API de colección de Discogs, usando los ítems de
+    templates_path como plantilla (artista, título, formatos, sellos). Pasada la primera
+    vuelta, los artistas llevan un " (k)" de Discogs y los títulos se generan con _title,
+    así que todas las claves artista|título son distintas y no se confunden entre sí.
+    """
+    templates = []
+    if os.path.exists(templates_path):
+        with open(templates_path, encoding="utf-8") as f:
+            templates = [(it.get("artist") or "", it.get("title") or "", it.get("formats") or [],
+                          it.get("labels") or []) for it in json.load(f)]
+    templates = [t for t in templates if t[0] and t[1]] or [(a, t, ["Vinyl"], []) for a, t in _BUILTIN]
+    out = []
+    base = datetime.datetime(2015, 1, 1)
+    for i in range(n):
+        artist, title, formats, labels = templates[i % len(templates)]
+        k = i // len(templates)
+        if k:
+            artist = f"{_clean(artist)} ({k + 1})"
+            title = _title(i * 2654435761 % 262144)   # permutación: vecinos sin palabras en común
+        out.append({
+            "id": 1000000 + i, "instance_id": 5000000 + i,
+            "date_added": (base + datetime.timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S-00:00"),
+            "basic_information": {
+                "id": 1000000 + i, "master_id": 200000 + i if i % 4 else 0, "title": title, "year": 0,
+                "artists": [{"name": artist}], "formats": [{"name": f} for f in formats],
+                "labels": [{"name": l} for l in labels],
+            },
+        })
+    return out
+
+
+def record(url):
+    """Guarda la respuesta real de url para que el servidor la reproduzca."""
+    import requests
+    r = requests.get(url, headers={"User-Agent": "discogs-anniv-bot/1.1"}, timeout=30)
+    parts = urlsplit(url)
+    path_qs = parts.path + (f"?{parts.query}" if parts.query else "")
+    path = replay_path(parts.hostname, path_qs)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"status": r.status_code, "content_type": r.headers.get("Content-Type", "text/html"),
+                            "url": url}) + "\n")
+        f.write(r.text)
+    print("guardado", path)
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Servicios simulados para benchmarks")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--size", type=int, default=384, help="ítems de la colección sintética")
+    ap.add_argument("--latency", type=float, default=0.0, help="latencia media por petición (ms)")
+    ap.add_argument("--errors", type=float, default=0.0, help="fracción de respuestas 500")
+    ap.add_argument("--r429", type=float, default=0.0, help="fracción de respuestas 429")
+    ap.add_argument("--record", metavar="URL", help="graba una respuesta real para replay")
+    args = ap.parse_args()
+    if args.record:
+        record(args.record)
+        sys.exit()
+    svc = FakeServices(synthetic_releases(args.size), port=args.port, latency_ms=args.latency,
+                       error_rate=args.errors, rate_429=args.r429).start()
+    print(f"Sirviendo en {svc.url}  (ANNIV_REDIRECT={svc.url}  DISCOGS_API_BASE={svc.url}/api.discogs.com)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        svc.stop()
@@ -0,0 +1,91 @@
+import os, json
+
+# Log de checkpoint del enriquecimiento: una fila JSON por línea, escrita (y fsync) en
+# cuanto termina cada ítem. Si el proceso se corta, el siguiente `enrich` retoma desde
+# aquí; al terminar se compacta al JSON final con escritura atómica y se borra el log.
+
+CHECKPOINT = "data/enrich.checkpoint.jsonl"
+
+
+class CheckpointLog:
+    def __init__(self, path=CHECKPOINT):
+        self.path = path
+        self.f = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def rows(self):
+        """Filas del log en orden; una línea truncada al final (corte a mitad de escritura) se ignora."""
+        if not self.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def _drop_torn_tail(self):
+        # una línea a medio escribir al final se recorta hasta el último "\n": si no, la
+        # primera fila del reinicio quedaría pegada a ella y rows() la perdería
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                start = max(0, pos - 4096)
+                f.seek(start)
+                i = f.read(pos - start).rfind(b"\n")
+                if i >= 0:
+                    pos = start + i + 1
+                    break
+                pos = start
+            if pos != end:
+                f.truncate(pos)
+
+    def open(self):
+        if self.exists():
+            self._drop_torn_tail()
+        self.f = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def append(self, row):
+        self.append_many([row])
+
+    def append_many(self, rows):
+        """Varias filas con una sola escritura y un solo fsync (p.ej. los miembros de una obra)."""
+        self.f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+
+    def discard(self):
+        self.close()
+        if self.exists():
+            os.remove(self.path)
+
+
+def write_json_array(rows, path):
+    """
+    Escribe un iterable de filas como array JSON (mismo formato que save_json, indent=2)
+    sin tenerlas todas en memoria: temporal + os.replace para que sea atómico.
+    """
+    tmp = path + ".tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write("[\n" if n == 0 else ",\n")
+            f.write("\n".join("  " + ln for ln in json.dumps(row, ensure_ascii=False, indent=2).split("\n")))
+            n += 1
+        f.write("\n]" if n else "[]")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return n
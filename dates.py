@@ -0,0 +1,81 @@
+import re, datetime
+from functools import lru_cache
+
+# Parser de fechas con vía rápida para los formatos habituales de las fuentes
+# (ISO, "August 18, 2016", "18 August 2016", "May 1995", "1996") y dateparser como
+# último recurso. Se respeta la precisión del texto: sólo año -> 'YYYY', mes y año -> 'YYYY-MM'.
+
+_MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
+    "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+}
+_MONTHS.update({k[:3]: v for k, v in list(_MONTHS.items())})
+_MONTHS["sept"] = 9
+
+_TIME = r"(?:[ T]\d{2}:\d{2}(?::\d{2})?(?:\.\d+)?\s*(?:Z|GMT|UTC|[+-]\d{2}:?\d{2})?)?"
+_ISO_DAY = re.compile(rf"(\d{{4}})-(\d{{2}})-(\d{{2}}){_TIME}")
+_ISO_MONTH = re.compile(r"(\d{4})-(\d{2})")
+_YEAR = re.compile(r"(\d{4})")
+_MDY = re.compile(rf"([A-Za-z]+)\.? (\d{{1,2}}),? (\d{{4}}){_TIME}")   # August 18, 2016
+_DMY = re.compile(rf"(\d{{1,2}}) ([A-Za-z]+)\.?,? (\d{{4}}){_TIME}")   # 18 August 2016
+_MY = re.compile(r"([A-Za-z]+)\.?,? (\d{4})")                       # May 1995
+
+
+def _day(y, m, d):
+    try:
+        return datetime.date(int(y), int(m), int(d)).isoformat()
+    except ValueError:
+        return None
+
+def _month(y, m):
+    m = int(m)
+    return f"{int(y):04d}-{m:02d}" if 1 <= m <= 12 else None
+
+
+def _fast(text):
+    """Fecha ISO (completa o parcial) para los formatos conocidos; None si no aplica."""
+    s = " ".join(text.split())
+    m = _ISO_DAY.fullmatch(s)
+    if m:
+        return _day(*m.groups())
+    m = _ISO_MONTH.fullmatch(s)
+    if m:
+        return _month(*m.groups())
+    m = _YEAR.fullmatch(s)
+    if m:
+        return m.group(1)
+    m = _MDY.fullmatch(s)
+    if m and m.group(1).lower() in _MONTHS:
+        return _day(m.group(3), _MONTHS[m.group(1).lower()], m.group(2))
+    m = _DMY.fullmatch(s)
+    if m and m.group(2).lower() in _MONTHS:
+        return _day(m.group(3), _MONTHS[m.group(2).lower()], m.group(1))
+    m = _MY.fullmatch(s)
+    if m and m.group(1).lower() in _MONTHS:
+        return _month(m.group(2), _MONTHS[m.group(1).lower()])
+    return None
+
+
+_DDP = None
+
+def _dateparser(text):
+    global _DDP
+    if _DDP is None:
+        from dateparser.date import DateDataParser  # import perezoso: dateparser tarda en cargar
+        _DDP = DateDataParser(settings={"PREFER_DAY_OF_MONTH": "first", "RETURN_AS_TIMEZONE_AWARE": False})
+    data = _DDP.get_date_data(text)
+    dt = data.date_obj if data else None
+    if not dt:
+        return None
+    if data.period == "year":
+        return f"{dt.year:04d}"
+    if data.period == "month":
+        return f"{dt.year:04d}-{dt.month:02d}"
+    return dt.date().isoformat()
+
+
+@lru_cache(maxsize=16384)
+def parse_date(text: str):
+    if not text:
+        return None
+    return _fast(text) or _dateparser(text)
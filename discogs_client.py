@@ -1,12 +1,16 @@
-import os, math, time, re, json
+import os, math, time, re, json, threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from tqdm import tqdm
 from utils import ensure_data_dir, save_json
+import net
+import store
 
 load_dotenv()
 
-BASE = "https://api.discogs.com"
+# DISCOGS_API_BASE permite apuntar a un servidor local (bench/fake_services.py)
+BASE = os.getenv("DISCOGS_API_BASE", "https://api.discogs.com").rstrip("/")
 USERNAME = os.getenv("DISCOGS_USERNAME", "").strip()
 TOKEN = os.getenv("DISCOGS_TOKEN", "").strip()
 
@@ -20,59 +24,240 @@ def _clean_artist_name(name: str) -> str:
     # Conserva "(Nor)", "(Swe)", etc., que ayudan a desambiguar bandas homónimas
     return re.sub(r"\s*\(\d+\)\s*$", "", name or "").strip()
 
-def fetch_collection(per_page=100):
-    if not USERNAME or not TOKEN:
-        raise RuntimeError("Configura DISCOGS_USERNAME y DISCOGS_TOKEN en .env")
+class _RatePacer:
+    """
+    Ritmo compartido entre hilos guiado por los headers X-Discogs-Ratelimit*.
+    Mientras queden peticiones en la ventana (60 s) se deja pasar en ráfaga;
+    cerca del límite se espacian las peticiones a ventana/límite.
+    """
+    def __init__(self, window=60.0, reserve=3):
+        self.window = window
+        self.reserve = reserve
+        self.limit = 60
+        self.remaining = None
+        self.next_at = 0.0
+        self.lock = threading.Lock()
 
-    ensure_data_dir()
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            if self.remaining is not None and self.remaining <= self.reserve:
+                self.next_at = start + self.window / max(self.limit, 1)
+            else:
+                self.next_at = start
+            if self.remaining is not None:
+                self.remaining -= 1
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
 
-    url = f"{BASE}/users/{USERNAME}/collection/folders/0/releases"
-    params = {"per_page": per_page, "page": 1}
-    resp = requests.get(url, headers=HEADERS, params=params, timeout=30)
-    resp.raise_for_status()
-    first = resp.json()
-    total = first.get("pagination", {}).get("items", 0)
-    pages = first.get("pagination", {}).get("pages", 1)
+    def update(self, resp):
+        h = resp.headers
+        with self.lock:
+            try:
+                self.limit = int(h.get("X-Discogs-Ratelimit", self.limit))
+            except ValueError:
+                pass
+            rem = h.get("X-Discogs-Ratelimit-Remaining")
+            if rem is not None:
+                try:
+                    self.remaining = int(rem)
+                except ValueError:
+                    pass
+            if resp.status_code == 429:
+                # ventana agotada (otro proceso comparte el token): esperar lo que pida el servidor
+                try:
+                    wait = float(h.get("Retry-After") or self.window)
+                except ValueError:
+                    wait = self.window
+                self.remaining = 0
+                self.next_at = max(self.next_at, time.monotonic() + wait)
 
-    items = []
-    def extract(page_json):
-        for it in page_json.get("releases", []):
-            basic = it.get("basic_information", {})
-            title = (basic.get("title") or "").strip()
-            artists = basic.get("artists", []) or []
-            artist = (artists[0].get("name") if artists else "").strip()
-            formats = [f.get("name") for f in (basic.get("formats") or []) if f.get("name")]
-            item = {
-                "artist": artist,
-                "artist_clean": _clean_artist_name(artist),
-                "title": title,
-                "formats": formats,
-            }
-            items.append(item)
-
-        labels = []
-        for lab in (basic.get("labels") or []):
-            nm = lab.get("name")
-            if nm:
-                labels.append(nm)
 
+PACER = _RatePacer()
+
+
+def _get_paced(url, params, max_attempts=5):
+    for attempt in range(max_attempts):
+        PACER.wait()
+        r = requests.get(url, headers=HEADERS, params=params, timeout=30)
+        PACER.update(r)
+        if r.status_code in (500, 502, 504):
+            # error transitorio del servidor: reintentar con espera creciente (como net.configure)
+            time.sleep(0.5 * 2 ** attempt)
+            continue
+        if r.status_code != 429:
+            r.raise_for_status()
+            return r
+    r.raise_for_status()
+
+
+def _extract_items(page_json):
+    items = []
+    for it in page_json.get("releases", []):
+        basic = it.get("basic_information", {})
+        title = (basic.get("title") or "").strip()
+        artists = basic.get("artists", []) or []
+        artist = (artists[0].get("name") if artists else "").strip()
+        formats = [f.get("name") for f in (basic.get("formats") or []) if f.get("name")]
+        labels = [lab.get("name") for lab in (basic.get("labels") or []) if lab.get("name")]
         item = {
             "artist": artist,
             "artist_clean": _clean_artist_name(artist),
             "title": title,
             "formats": formats,
-            "labels": labels,  # ← nuevo
-        }    
+            "labels": labels,
+            "release_id": basic.get("id") or it.get("id"),
+            "master_id": basic.get("master_id") or None,   # 0 = release sin master
+            "year": basic.get("year") or None,             # año de esta edición, no del original
+            "instance_id": it.get("instance_id"),
+            "date_added": it.get("date_added"),
+        }
+        items.append(item)
+    return items
 
-    extract(first)
+
+def _released(value):
+    """'released' de Discogs a ISO: '1994-02-15' igual, '1994-02-00' -> '1994-02', '1994-00-00' -> '1994'."""
+    parts = (value or "").strip().split("-")
+    if not parts[0].isdigit() or len(parts[0]) != 4 or parts[0] == "0000":
+        return None
+    out = [parts[0]]
+    for p in parts[1:3]:
+        if not p.isdigit() or int(p) == 0:
+            break
+        out.append(f"{int(p):02d}")
+    return "-".join(out)
+
+
+@net.driven
+def release_date(release_id=None, master_id=None):
+    """
+    Fecha original directamente desde Discogs, por id y sin búsquedas difusas: el master
+    apunta a su main_release (la edición original) y se lee su 'released'; sin master,
+    la propia release es la única edición. Es una fuente-generador (ver net.driven): las
+    peticiones las hace net.GET o anet.GET, con caché HTTP y presupuesto por host de
+    api.discogs.com (throttle.HOST_LIMITS), que respeta los 429/Retry-After.
+    Devuelve (fecha ISO completa o parcial, 'discogs', url) o None.
+    """
+    year = None
+    if master_id:
+        r = yield net.Fetch(f"{BASE}/masters/{master_id}", ttl="lookup", headers=HEADERS)
+        if r.status_code != 200:
+            return None
+        js = r.json()
+        release_id, year = js.get("main_release") or release_id, js.get("year") or None
+    if not release_id:
+        return None
+    url = f"https://www.discogs.com/release/{release_id}"
+    r = yield net.Fetch(f"{BASE}/releases/{release_id}", ttl="lookup", headers=HEADERS)
+    released = _released(r.json().get("released")) if r.status_code == 200 else None
+    # el año del master sirve de fecha parcial si la edición original no trae más
+    if released or year:
+        return released or f"{int(year):04d}", "discogs", url
+    return None
+
+
+def _collection_url():
+    if not USERNAME or not TOKEN:
+        raise RuntimeError("Configura DISCOGS_USERNAME y DISCOGS_TOKEN en .env")
+    return f"{BASE}/users/{USERNAME}/collection/folders/0/releases"
+
+
+def _download_all(url, params, workers=4):
+    """Descarga todas las páginas en paralelo. Devuelve (items en orden de página, total)."""
+    first = _get_paced(url, {**params, "page": 1}).json()
+    total = first.get("pagination", {}).get("items", 0)
+    pages = first.get("pagination", {}).get("pages", 1)
+
+    def fetch_page(page):
+        return _extract_items(_get_paced(url, {**params, "page": page}).json())
+
+    # páginas en paralelo; el orden se conserva indexando por número de página
+    by_page = {1: _extract_items(first)}
     if pages > 1:
-        for page in tqdm(range(2, pages + 1), desc="Descargando colección"):
-            params["page"] = page
-            r = requests.get(url, headers=HEADERS, params=params, timeout=30)
-            r.raise_for_status()
-            extract(r.json())
-            time.sleep(0.2)  # cuida rate limit
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            rest = range(2, pages + 1)
+            for page, page_items in tqdm(zip(rest, ex.map(fetch_page, rest)), total=pages - 1, desc="Descargando colección"):
+                by_page[page] = page_items
 
-    # Guardar
+    return [it for page in sorted(by_page) for it in by_page[page]], total
+
+
+def _save_raw(items):
     save_json(items, "data/collection.raw.json")
+    if store.active():
+        store.get_store().replace_raw(items)
+
+
+def fetch_collection(per_page=100, workers=4):
+    url = _collection_url()
+    ensure_data_dir()
+
+    items, _ = _download_all(url, {"per_page": per_page}, workers=workers)
+
+    # Guardar
+    _save_raw(items)
     return len(items)
+
+
+SYNC_STATE = "data/sync_state.json"
+
+def sync_collection(per_page=100, workers=4):
+    """
+    Sincronización incremental: pide la colección ordenada por fecha de alta (desc)
+    y se detiene en cuanto aparece un instance_id ya conocido. Si el total de Discogs
+    no cuadra con lo conocido + lo nuevo, hubo bajas y se hace un listado completo
+    para identificarlas.
+    Devuelve (nuevos, eliminados, total).
+    """
+    url = _collection_url()
+    ensure_data_dir()
+
+    prev = store.load_raw()
+    if not prev or any(it.get("instance_id") is None for it in prev):
+        # sin cursor utilizable (primera vez o formato antiguo): descarga completa
+        items, _ = _download_all(url, {"per_page": per_page}, workers=workers)
+        _save_raw(items)
+        _save_sync_state(items, [])
+        return items, [], len(items)
+
+    known = {it["instance_id"] for it in prev}
+    params = {"per_page": per_page, "sort": "added", "sort_order": "desc"}
+    new, total, page, pages = [], 0, 1, 1
+    while page <= pages:
+        js = _get_paced(url, {**params, "page": page}).json()
+        total = js.get("pagination", {}).get("items", 0)
+        pages = js.get("pagination", {}).get("pages", 1)
+        page_items = _extract_items(js)
+        fresh = [it for it in page_items if it.get("instance_id") not in known]
+        new.extend(fresh)
+        if len(fresh) < len(page_items):
+            break  # llegamos a ítems conocidos
+        page += 1
+
+    removed = []
+    if total != len(prev) + len(new):
+        # mismo listado (y orden) que fetch_collection
+        items, total = _download_all(url, {"per_page": per_page}, workers=workers)
+        current = {it.get("instance_id") for it in items}
+        removed = [it for it in prev if it["instance_id"] not in current]
+        new = [it for it in items if it.get("instance_id") not in known]
+    else:
+        # `new` viene del más reciente al más antiguo; el listado completo va por fecha de
+        # alta ascendente, así que las altas se añaden al final en ese orden
+        items = prev + new[::-1]
+
+    _save_raw(items)
+    _save_sync_state(new, removed)
+    return new, removed, total
+
+
+def _save_sync_state(new, removed):
+    # registro de la última sincronización; el punto de corte son los instance_id ya conocidos
+    save_json({
+        "synced_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "new": [it.get("instance_id") for it in new],
+        "removed": [it.get("instance_id") for it in removed],
+    }, SYNC_STATE)
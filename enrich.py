@@ -1,19 +1,117 @@
 from utils import load_json, save_json
-from sources import find_release_date
+from sources import find_release_date, find_release_date_async, configure_race, musicbrainz_prefetch, musicbrainz_batches, cached_resolution, resolution_history
+import net
+import store
 from tqdm import tqdm   # <--- agrega esta importación
-import json, os
+import json, os, time
 from utils import load_json, save_json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from checkpoint import CheckpointLog, write_json_array
+from metrics import METRICS
+from matching import canon, work_title
+from discogs_client import _clean_artist_name
+
+FIELDS = ("release_date", "release_source", "release_url")
 
 def _load_overrides():
+    if store.active():
+        return {(o["artist"].lower(), o["title"].lower()): o["release_date"] for o in store.get_store().overrides()}
     p = "data/overrides.json"
     if os.path.exists(p):
         with open(p, encoding="utf-8") as f:
             return {(o["artist"].lower(), o["title"].lower()): o["release_date"] for o in json.load(f)}
     return {}
 
-def enrich_release_dates(max_workers=6, only_missing=False):
-    data = load_json("data/collection.raw.json") or []
+def _item_key(it):
+    return ((it.get("artist_clean") or it.get("artist") or "").strip().lower(),
+            (it.get("title") or "").strip().lower())
+
+def _work_key(it):
+    """Obra a la que pertenece el ítem: artista sin el "(n)" de Discogs y título sin sufijos de edición."""
+    artist = _clean_artist_name(it.get("artist_clean") or it.get("artist") or "")
+    return canon(artist), canon(work_title(it.get("title") or ""))
+
+def _representative(members):
+    # el que mejor se resuelve: con master de Discogs (fecha original), sin sufijo de edición, con release
+    return min(members, key=lambda it: (not it.get("master_id"),
+                                         work_title(it.get("title") or "") != (it.get("title") or "").strip(),
+                                         not it.get("release_id")))
+
+def _cluster(items):
+    """
+    Agrupa por obra los ítems (ya sin duplicados exactos): [(representante, miembros), ...].
+    Dos masters de Discogs distintos son obras distintas aunque el título coincida; los
+    ítems sin master se unen al primero.
+    """
+    groups = {}
+    for it in items:
+        groups.setdefault(_work_key(it), []).append(it)
+    out = []
+    for members in groups.values():
+        by_master = {}
+        for it in members:
+            if it.get("master_id"):
+                by_master.setdefault(it["master_id"], []).append(it)
+        subs = list(by_master.values()) or [[]]
+        subs[0] = subs[0] + [it for it in members if not it.get("master_id")]
+        out += [(_representative(sub), sub) for sub in subs]
+    return out
+
+def _work_index(entries):
+    """{obra: {master_id: valor}} a partir de ((obra, master_id), valor); manda el primero."""
+    idx = {}
+    for (work, master), value in entries:
+        idx.setdefault(work, {}).setdefault(master or None, value)
+    return idx
+
+def _work_get(idx, it):
+    """
+    Valor de _work_index para la obra de `it`, con las reglas de _cluster: dos masters
+    distintos son obras distintas y lo que no tiene master se une a la obra.
+    """
+    by_master = idx.get(_work_key(it)) or {}
+    master = it.get("master_id")
+    if master:
+        return by_master.get(master) or by_master.get(None)
+    return by_master.get(None) or next(iter(by_master.values()), None)
+
+def _needs_search(it):
+    if it.get("release_id") or it.get("master_id"):
+        return False
+    artist, title = (it.get("artist_clean") or it.get("artist") or "").strip(), (it.get("title") or "").strip()
+    if cached_resolution(artist, title):
+        return False
+    h = resolution_history(artist, title)
+    return not (h and h["pins"].get("rg_mbid"))
+
+def _run_threads(items, worker, emit, max_workers, prefetch=()):
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        for fn, *args in prefetch:
+            ex.submit(fn, *args)
+        # ventana acotada de futuros en vuelo: la memoria no crece con la colección
+        todo = iter(items)
+        inflight = set()
+        while True:
+            for it in todo:
+                inflight.add(ex.submit(worker, it))
+                if len(inflight) >= max_workers * 4:
+                    break
+            if not inflight:
+                break
+            finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                emit(*fut.result())
+
+
+def enrich_release_dates(max_workers=None, only_missing=False, incremental=False, race=False, engine="threads"):
+    """
+    engine="threads": ThreadPoolExecutor con `max_workers` ítems (por defecto 12).
+    engine="asyncio": corrutinas con HTTP asíncrono (anet/aiohttp), por defecto 200 ítems
+    en vuelo; el límite real lo ponen los presupuestos por host de throttle.py.
+    """
+    if max_workers is None:
+        max_workers = 200 if engine == "asyncio" else 12
+    data = store.load_raw()
     # dedup por artista+título
     seen, items = set(), []
     for it in data:
@@ -27,25 +125,78 @@ def enrich_release_dates(max_workers=6, only_missing=False):
     # si hay enriched previo y only_missing=True, carga y salta los que ya tienen fecha
     existing = {}
     if only_missing:
-        prev = load_json("data/collection.enriched.json") or []
+        prev = store.load_enriched() or []
         for row in prev:
             k = ((row.get("artist_clean") or row.get("artist") or "").strip().lower(),
                  (row.get("title") or "").strip().lower())
             existing[k] = row
 
-    def worker(it):
-        artist = (it.get("artist") or it.get("artist_clean") or "").strip()
-        artist_orig  = (it.get("artist") or "").strip()
-        artist_clean = (it.get("artist_clean") or artist_orig).strip()
-        title        = (it.get("title") or "").strip()
+    # incremental: lo ya enriquecido (con o sin fecha) se reutiliza; sólo lo nuevo se busca.
+    # Los eliminados de la colección desaparecen solos porque se recorre el raw actual.
+    reused = []
+    if incremental:
+        prev, dated = {}, []
+        for row in store.load_enriched() or []:
+            prev[_item_key(row)] = row
+            if row.get("release_date"):
+                dated.append(((_work_key(row), row.get("master_id")), row))
+        prev_work = _work_index(dated)
+        pending = []
+        for it in items:
+            # una edición nueva de una obra ya resuelta hereda su fecha
+            old = prev.get(_item_key(it)) or _work_get(prev_work, it)
+            if old is None:
+                pending.append(it)
+            else:
+                reused.append({**it, **{f: old.get(f) for f in FIELDS}})
+        items = pending
+
+    # overrides manuales (data/overrides.json o el almacén) mandan sobre cualquier fuente:
+    # por artista+título exactos o, si no, por obra (con el master del ítem corregido)
+    overrides = _load_overrides()
+    masters = {_item_key(it): it.get("master_id") for it in data}
+    by_work = _work_index(((_work_key({"artist": a, "title": t}), masters.get((a.strip(), t.strip()))), d)
+                          for (a, t), d in overrides.items())
+    pending = []
+    for it in items:
+        d = overrides.get(_item_key(it)) or _work_get(by_work, it)
+        if d:
+            reused.append({**it, "release_date": d, "release_source": "override", "release_url": None})
+        else:
+            pending.append(it)
+
+    # una búsqueda por obra: remasters, reediciones y formatos comparten la del representante
+    groups = _cluster(pending)
+    members_of = {_item_key(rep): members for rep, members in groups}
+    items = [rep for rep, _ in groups]
+    if len(items) < len(pending):
+        print(f"[enrich] {len(pending)} ítems agrupados en {len(items)} obras")
+
+    if engine == "threads":
+        net.configure(pool_size=max_workers)
+        if race:
+            configure_race(max_workers)
+    METRICS.reset()
 
+    def known(it):
+        """Fila ya resuelta en el enriched previo (only_missing), o None."""
         if only_missing:
-            k = (artist.lower(), title.lower())
-            old = existing.get(k)
+            artist = (it.get("artist") or it.get("artist_clean") or "").strip()
+            old = existing.get((artist.lower(), (it.get("title") or "").strip().lower()))
             if old and old.get("release_date"):
-                # ya lo teníamos, devolver tal cual
-                return {**it, **{k: old.get(k) for k in ("release_date","release_source","release_url")}}, bool(old.get("release_date"))
-        info = find_release_date(artist_clean, title, artist_original=artist_orig)
+                # ya lo teníamos, devolver tal cual (no es una fecha encontrada ahora)
+                return {**it, **{k: old.get(k) for k in FIELDS}}, False
+        return None
+
+    def search(it):
+        """Argumentos de find_release_date (o find_release_date_async) para el ítem."""
+        artist_orig  = (it.get("artist") or "").strip()
+        return ((it.get("artist_clean") or artist_orig).strip(), (it.get("title") or "").strip()), \
+               dict(artist_original=artist_orig, race=race,
+                    labels=it.get("labels") or (), formats=it.get("formats") or (),
+                    release_id=it.get("release_id"), master_id=it.get("master_id"))
+
+    def to_row(it, info):
         row = {**it, "release_date": None, "release_source": None, "release_url": None}
         if isinstance(info, dict) and info.get("date"):
             row["release_date"] = info["date"]
@@ -54,37 +205,143 @@ def enrich_release_dates(max_workers=6, only_missing=False):
             return row, True
         return row, False
 
-    out, n_ok = [], 0
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futs = [ex.submit(worker, it) for it in items]
-        for fut in tqdm(as_completed(futs), total=len(futs), desc="Buscando fechas", unit="rel"):
-            row, ok = fut.result()
-            if ok: n_ok += 1
-            out.append(row)
+    def worker(it):
+        args, kwargs = search(it)
+        return known(it) or to_row(it, find_release_date(*args, **kwargs))
+
+    async def aworker(it):
+        args, kwargs = search(it)
+        return known(it) or to_row(it, await find_release_date_async(*args, **kwargs))
+
+    # checkpoint: cada obra terminada se añade al log (todos sus miembros de una vez); si
+    # hay un log de una ejecución cortada, lo ya hecho se salta y se retoma desde ahí.
+    # Una obra cuenta como hecha sólo si están todos sus miembros: un corte a mitad de
+    # escritura puede dejar el grupo a medias, y entonces se repite entero
+    log = CheckpointLog()
+    logged = set()
+    if log.exists():
+        logged = {_item_key(row) for row in log.rows()}
+        print(f"[enrich] Retomando desde {log.path}: {len(logged)} ítems ya resueltos")
+    items = [it for it in items
+             if not all(_item_key(m) in logged for m in members_of.get(_item_key(it), [it]))]
+    n_found = 0   # ítems (miembros incluidos) con fecha encontrada en esta ejecución
+    log.open()
+    try:
+        for row in reused:
+            if _item_key(row) not in logged:
+                log.append(row)
+
+        # búsquedas de MusicBrainz por lotes (un OR por artista) antes que los ítems,
+        # sólo para lo que de verdad habrá que buscar: lo que tiene ids de Discogs o un
+        # release-group de MusicBrainz fijado se resuelve primero por id
+        pending = [it for it in items if _needs_search(it)]
+        batches = musicbrainz_batches(pending)
+
+        with tqdm(total=len(items), desc="Buscando fechas", unit="rel") as bar:
+            def emit(row, ok):
+                nonlocal n_found
+                members = members_of.get(_item_key(row), [row])
+                log.append_many([{**m, **{f: row.get(f) for f in FIELDS}} for m in members])
+                n_found += len(members) if ok else 0
+                bar.update(1)
+            if engine == "asyncio":
+                from async_engine import run_items
+                run_items(items, aworker, emit, max_workers,
+                          [musicbrainz_prefetch.steps(artist, titles) for artist, titles in batches])
+            else:
+                _run_threads(items, worker, emit, max_workers,
+                             [(musicbrainz_prefetch, artist, titles) for artist, titles in batches])
+    finally:
+        log.close()
 
-    save_json(out, "data/collection.enriched.json")
-    return n_ok, len(items)
+    # compactar: el log (filtrado a la colección actual) pasa al destino final de forma atómica.
+    # Un grupo repetido tras un corte deja filas dobles: manda la última de cada ítem
+    current = {_item_key(it) for it in data}
+    last = {}
+    for i, row in enumerate(log.rows()):
+        last[_item_key(row)] = i
+    n_ok = n_total = 0
+    def rows():
+        nonlocal n_ok, n_total
+        for i, row in enumerate(log.rows()):
+            k = _item_key(row)
+            if k in current and last[k] == i:
+                n_total += 1
+                n_ok += bool(row.get("release_date"))
+                yield row
+    if store.active():
+        store.get_store().replace_enrichment(rows())
+    else:
+        write_json_array(rows(), "data/collection.enriched.json")
+    log.discard()
+    # como en retry-missing: `found` son sólo las fechas encontradas en esta ejecución, no
+    # las reutilizadas ni las de un log retomado (n_ok las cuenta todas)
+    METRICS.save("enrich", items=len(items), found=n_found)
+    return n_ok, n_total
 
 
-def enrich_missing_only():
-    data = load_json("data/collection.enriched.json") or []
-    if not data:
+def enrich_missing_only(max_workers=12, limit=None):
+    """
+    Reintenta en paralelo los ítems sin fecha. Cada ítem lleva historial de intentos en el
+    almacén de resoluciones (nº de intentos, último intento, fuentes probadas) y se salta
+    mientras dure su back-off exponencial; primero van los que menos veces han fallado.
+    `limit` acota cuántos ítems se reintentan en esta ejecución.
+    """
+    db = store.get_store() if store.active() else None
+    if db is not None:
+        # con el almacén SQLite sólo se leen los faltantes y se actualiza fila a fila
+        missing = db.enriched(missing_only=True)
+        total = db.count_enriched()
+    else:
+        data = load_json("data/collection.enriched.json") or []
+        missing = [x for x in data if not x.get("release_date")]
+        total = len(data)
+    if not total:
         print("No existe data/collection.enriched.json. Ejecuta primero: python app.py enrich")
         return 0, 0
 
-    n_new = 0
-    for it in tqdm([x for x in data if not x.get("release_date")], desc="Reintentando faltantes"):
+    # como en enrich: una búsqueda por obra, con el historial (y el back-off) del representante
+    now = time.time()
+    due, waiting = [], 0
+    for i, (rep, members) in enumerate(_cluster(missing)):
+        h = resolution_history((rep.get("artist_clean") or rep.get("artist") or "").strip(),
+                               (rep.get("title") or "").strip())
+        if h and h["retry_at"] and h["retry_at"] > now:
+            waiting += len(members)
+            continue
+        due.append(((h or {}).get("attempts", 0), (h or {}).get("resolved_at") or 0, i, rep, members))
+    due.sort(key=lambda d: d[:3])
+    if limit is not None:
+        due = due[:limit]
+    if waiting:
+        print(f"[retry-missing] {waiting} ítems en back-off; se reintentan {sum(len(d[-1]) for d in due)}")
+
+    net.configure(pool_size=max_workers)
+    METRICS.reset()
+
+    def worker(it, members):
         artist_orig  = (it.get("artist") or "").strip()
         artist_clean = (it.get("artist_clean") or artist_orig).strip()
         title        = (it.get("title") or "").strip()
+        return members, find_release_date(artist_clean, title, artist_original=artist_orig,
+                                          labels=it.get("labels") or (), formats=it.get("formats") or (),
+                                          release_id=it.get("release_id"), master_id=it.get("master_id"))
 
-        info = find_release_date(artist_clean, title, artist_original=artist_orig)
-        if isinstance(info, dict) and info.get("date"):
-            it["release_date"]  = info["date"]
-            it["release_source"] = info.get("source")
-            it["release_url"]    = info.get("url")
-            n_new += 1
-
-    save_json(data, "data/collection.enriched.json")
-    return n_new, len(data)
+    n_new = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futs = [ex.submit(worker, rep, members) for *_, rep, members in due]
+        for fut in tqdm(as_completed(futs), total=len(futs), desc="Reintentando faltantes"):
+            members, info = fut.result()
+            if isinstance(info, dict) and info.get("date"):
+                for it in members:
+                    it["release_date"]  = info["date"]
+                    it["release_source"] = info.get("source")
+                    it["release_url"]    = info.get("url")
+                    n_new += 1
+                    if db is not None:
+                        db.upsert_enrichment(it)
 
+    if db is None and n_new:
+        save_json(data, "data/collection.enriched.json")
+    METRICS.save("retry-missing", items=len(due), found=n_new)
+    return n_new, total
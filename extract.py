@@ -0,0 +1,156 @@
+import re
+from lxml import html as lxml_html
+from metrics import METRICS
+
+# Extracción HTML dirigida: en vez de construir un árbol BeautifulSoup de la página
+# completa, se recorta del texto sólo el fragmento que interesa (infobox, #album_info,
+# <head>, ...) y se parsea con lxml. Los valores devueltos son los mismos que daban
+# las versiones con BeautifulSoup (mismas reglas de get_text/strip).
+
+_SKIP = ("script", "style", "template")
+
+
+def _slice_element(page, start, tag):
+    """Recorta desde `start` (un '<tag') hasta su cierre, contando anidamientos del mismo tag."""
+    depth = 0
+    for m in re.compile(rf"<(/?){tag}\b[^>]*>", re.I).finditer(page, start):
+        if m.group(1):
+            depth -= 1
+            if depth == 0:
+                return page[start:m.end()]
+        elif not m.group(0).endswith("/>"):
+            depth += 1
+    return page[start:]  # sin cierre: hasta el final
+
+
+def _find_open_tag(page, attr_pattern, tag=r"[a-zA-Z][a-zA-Z0-9]*"):
+    """Posición y nombre del primer tag de apertura cuyos atributos casan con `attr_pattern`."""
+    m = re.search(rf"<({tag})\b[^>]*?{attr_pattern}[^>]*>", page, re.I)
+    return (m.start(), m.group(1).lower()) if m else (None, None)
+
+
+def _fragment(page, attr_pattern, tag=r"[a-zA-Z][a-zA-Z0-9]*"):
+    start, name = _find_open_tag(page, attr_pattern, tag)
+    if start is None:
+        return None
+    frag = _slice_element(page, start, name)
+    try:
+        return lxml_html.fragment_fromstring(frag, create_parent="div")
+    except Exception:
+        return None
+
+
+def _strings(el, skip=()):
+    # mismo recorrido que BeautifulSoup: cada nodo de texto por separado, sin comentarios
+    # ni contenido de script/style; los tags de `skip` se omiten enteros (su cola no)
+    if el.text and el.tag not in _SKIP:
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str) and child.tag not in skip:
+            yield from _strings(child, skip)
+        if child.tail:
+            yield child.tail
+
+
+def text(el, sep="", strip=False, skip=()):
+    """Equivalente a BeautifulSoup.get_text(sep, strip=strip); `skip` emula decompose() de esos tags."""
+    if strip:
+        return sep.join(s for s in (t.strip() for t in _strings(el, skip)) if s)
+    return sep.join(_strings(el, skip))
+
+
+@METRICS.timed_parse
+def fragment_text(snippet):
+    """Texto de un trozo de HTML suelto (p.ej. el <a> de la búsqueda de Metal Archives)."""
+    try:
+        return text(lxml_html.fragment_fromstring(snippet or "", create_parent="div"))
+    except Exception:
+        return snippet or ""
+
+
+# ---------- Wikipedia ----------
+@METRICS.timed_parse
+def wikipedia_title_and_released(page):
+    """
+    (título del #firstHeading o None, texto de la fila Released/Release date de la infobox o None).
+    Sólo se parsean el <h1> y la primera tabla/elemento con clase infobox.
+    """
+    title = None
+    h1 = _fragment(page, r'id="firstHeading"')
+    if h1 is not None:
+        title = text(h1, strip=True)
+
+    box = _fragment(page, r'class="(?:[^"]*\s)?infobox(?:\s[^"]*)?"')
+    if box is None:
+        return title, None
+    for th in box.xpath(".//tr//th"):
+        if text(th, strip=True).lower() in {"released", "release date"}:
+            val = th.xpath("following::td[1]")
+            if not val:
+                continue
+            return title, text(val[0], " ", strip=True, skip=("sup",)).split(";")[0]
+    return title, None
+
+
+# ---------- Metal Archives ----------
+@METRICS.timed_parse
+def ma_discography_rows(page):
+    """[(título, href, año), ...] de las filas de table.display (la página /tab/all es pequeña)."""
+    try:
+        root = lxml_html.fromstring(page)
+    except Exception:
+        return []
+    rows = []
+    for tr in root.xpath('//table[contains(concat(" ", normalize-space(@class), " "), " display ")]//tbody//tr'):
+        cols = tr.xpath(".//td")
+        if not cols:
+            continue
+        a = cols[0].xpath(".//a")
+        if not a:
+            continue
+        a = a[0]
+        year = text(cols[2], strip=True) if len(cols) >= 3 else None
+        rows.append((text(a, strip=True), a.get("href"), year))
+    return rows
+
+
+@METRICS.timed_parse
+def ma_release_date_text(page):
+    """Texto del <dd> que sigue al primer <dt> 'Release date' dentro de #album_info."""
+    info = _fragment(page, r'id="album_info"')
+    if info is None:
+        return None
+    for dt in info.xpath(".//dt"):
+        if text(dt, strip=True).lower().startswith("release date"):
+            dd = dt.xpath("following-sibling::dd[1]")
+            return text(dd[0], " ", strip=True) if dd else None
+    return None
+
+
+# ---------- Bandcamp ----------
+_META_KEYS = (("itemprop", "datePublished"), ("property", "music:release_date"), ("property", "og:release_date"))
+
+@METRICS.timed_parse
+def bandcamp_meta_date(page):
+    """content= del primer meta de fecha (por orden de preferencia); sólo se parsean los <meta>."""
+    metas = re.findall(r"<meta\b[^>]*>", page, re.I)
+    if not metas:
+        return None
+    try:
+        root = lxml_html.fragment_fromstring("".join(metas), create_parent="div")
+    except Exception:
+        return None
+    for attr, value in _META_KEYS:
+        found = root.xpath(f'.//meta[@{attr}="{value}"]')
+        if found:
+            return found[0].get("content")
+    return None
+
+
+@METRICS.timed_parse
+def page_text(page):
+    """Texto visible de toda la página (último recurso)."""
+    try:
+        return text(lxml_html.fromstring(page), " ", strip=True)
+    except Exception:
+        return ""
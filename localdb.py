@@ -0,0 +1,34 @@
+import sqlite3, threading
+from pathlib import Path
+
+# Lo común de los almacenes SQLite locales (store, resolutions, planner, ma_index, mb_dump):
+# una conexión en modo WAL compartida por todos los hilos (cada almacén serializa su uso
+# con su propio lock) y un único objeto por proceso, creado la primera vez que se pide.
+# Importar uno de esos módulos no crea data/ ni abre nada.
+
+
+def connect(path):
+    """Conexión WAL a `path` usable desde cualquier hilo; crea la carpeta si no existe."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+
+class Lazy:
+    """
+    Objeto único por proceso: `get = Lazy(Clase)` y `get()` lo crea la primera vez.
+    Con `when`, mientras when() sea falso no se crea y get() devuelve None.
+    """
+
+    def __init__(self, factory, when=None):
+        self.factory = factory
+        self.when = when
+        self.obj = None
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            if self.obj is None and (self.when is None or self.when()):
+                self.obj = self.factory()
+            return self.obj
@@ -0,0 +1,104 @@
+import os, json, time, threading
+from localdb import connect, Lazy
+
+# Índice local de Metal Archives: búsqueda de bandas, discografía parseada por band id
+# y fecha de cada página de álbum. Varias fechas de la misma banda reutilizan la misma
+# búsqueda y la misma discografía; todo se refresca pasado REFRESH.
+
+DB_PATH = "data/metal_archives.sqlite"
+REFRESH = float(os.getenv("ANNIV_MA_REFRESH_DAYS", "30")) * 86400
+
+
+def band_id_from_url(url: str) -> str:
+    # https://www.metal-archives.com/bands/Emperor/30 -> "30"
+    return (url or "").rstrip("/").rsplit("/", 1)[-1]
+
+
+class BandIndex:
+    def __init__(self, path=DB_PATH, refresh=REFRESH):
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.db = connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS band_search (
+                query      TEXT PRIMARY KEY,
+                rows       TEXT,          -- JSON [[band_url, nombre], ...]
+                fetched_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band_id    TEXT PRIMARY KEY,
+                band_url   TEXT,
+                fetched_at REAL           -- cuándo se descargó la discografía
+            );
+            CREATE TABLE IF NOT EXISTS discography (
+                band_id    TEXT,
+                pos        INTEGER,       -- orden en la tabla /tab/all
+                title      TEXT,
+                url        TEXT,
+                year       TEXT,
+                PRIMARY KEY (band_id, pos)
+            );
+            CREATE TABLE IF NOT EXISTS albums (
+                url        TEXT PRIMARY KEY,
+                band_id    TEXT,
+                date       TEXT,          -- NULL si la página no trae fecha utilizable
+                fetched_at REAL
+            );
+        """)
+        self.db.commit()
+
+    def _fresh(self, fetched_at):
+        return fetched_at is not None and time.time() - fetched_at < self.refresh
+
+    # --- búsqueda de bandas ---
+    def search(self, query):
+        with self.lock:
+            row = self.db.execute("SELECT rows, fetched_at FROM band_search WHERE query = ?",
+                                  (query.lower(),)).fetchone()
+        if row and self._fresh(row[1]):
+            return [tuple(r) for r in json.loads(row[0])]
+        return None
+
+    def put_search(self, query, rows):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO band_search VALUES (?, ?, ?)",
+                            (query.lower(), json.dumps(list(rows)), time.time()))
+            self.db.commit()
+
+    # --- discografía ---
+    def discography(self, band_url):
+        band_id = band_id_from_url(band_url)
+        with self.lock:
+            row = self.db.execute("SELECT fetched_at FROM bands WHERE band_id = ?", (band_id,)).fetchone()
+            if not row or not self._fresh(row[0]):
+                return None
+            rows = self.db.execute(
+                "SELECT title, url, year FROM discography WHERE band_id = ? ORDER BY pos",
+                (band_id,)).fetchall()
+        return rows
+
+    def put_discography(self, band_url, rows):
+        band_id = band_id_from_url(band_url)
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM discography WHERE band_id = ?", (band_id,))
+            self.db.executemany("INSERT INTO discography VALUES (?, ?, ?, ?, ?)",
+                                [(band_id, i, t, u, y) for i, (t, u, y) in enumerate(rows)])
+            self.db.execute("INSERT OR REPLACE INTO bands VALUES (?, ?, ?)", (band_id, band_url, time.time()))
+
+    # --- páginas de álbum ---
+    def album_date(self, url):
+        """Devuelve (encontrado, fecha)."""
+        with self.lock:
+            row = self.db.execute("SELECT date, fetched_at FROM albums WHERE url = ?", (url,)).fetchone()
+        if row and self._fresh(row[1]):
+            return True, row[0]
+        return False, None
+
+    def put_album_date(self, url, band_url, date):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO albums VALUES (?, ?, ?, ?)",
+                            (url, band_id_from_url(band_url), date, time.time()))
+            self.db.commit()
+
+
+get_index = Lazy(BandIndex)
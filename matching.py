@@ -0,0 +1,86 @@
+import re
+from functools import lru_cache
+from rapidfuzz import fuzz, process
+from unidecode import unidecode
+
+# Capa de matching compartida por todas las fuentes.
+# - canon() se memoiza: cada título/artista se canoniza una sola vez por proceso.
+# - score_many()/best_match() puntúan listas completas de candidatos con process.extract
+#   (bucle en C) y score_cutoff, en lugar de comparar par a par en Python.
+# La puntuación es la misma de siempre: max(token_set_ratio, partial_ratio) sobre formas canónicas.
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+@lru_cache(maxsize=65536)
+def canon(s: str) -> str:
+    s = unidecode((s or "").lower())
+    s = _NON_ALNUM.sub(" ", s)
+    return " ".join(s.split())
+
+
+# Sufijos de edición/formato que no cambian la obra: "(Remastered)", "[2LP]",
+# "- 2011 Remaster", "(Deluxe Edition)", "(20th Anniversary)", "(Reissue 2005)", ...
+# "(Live)", "(Demo)" o un año suelto ("Demo (1991)") se conservan: son otra grabación.
+_EDITION_WORDS = (r"re-?master(?:ed)?|re-?issue[sd]?|re-?release[sd]?|re-?press(?:ing)?|deluxe|expanded|"
+                  r"edition|anniversary|bonus|limited|special|collector'?s|digipa[ck]k?|digibook|"
+                  r"box ?set|mono|stereo|vinyl|cassette|picture ?dis[ck]|gatefold|"
+                  r"\d*\s*x?\s*(?:lp|cd|mc)s?")
+_EDITION_TAIL = re.compile(
+    rf"\s*(?:[\(\[][^\(\)\[\]]*\b(?:{_EDITION_WORDS})\b[^\(\)\[\]]*[\)\]]"
+    rf"|\s[-–—/:]\s+[^-–—/:\(\)\[\]]*\b(?:{_EDITION_WORDS})\b[^-–—/:\(\)\[\]]*)\s*$", re.I)
+
+@lru_cache(maxsize=65536)
+def work_title(title: str) -> str:
+    """Título sin sufijos de edición, remaster o formato (los del final, repetidos)."""
+    t = (title or "").strip()
+    while True:
+        s = _EDITION_TAIL.sub("", t)
+        if s == t or not s:
+            return t
+        t = s
+
+
+def score(a: str, b: str) -> float:
+    A, B = canon(a), canon(b)
+    # mezcla de métricas para ser tolerantes con apóstrofes/guiones
+    return max(fuzz.token_set_ratio(A, B), fuzz.partial_ratio(A, B))
+
+
+def ok(a, b, threshold=80):
+    return score(a, b) >= threshold
+
+
+def score_many(query, choices, cutoff=0):
+    """
+    Puntuación de `query` contra cada candidato, en el orden de `choices`.
+    Los que no llegan a `cutoff` valen 0.
+    """
+    q = canon(query)
+    canon_choices = [canon(c) for c in choices]
+    scores = [0] * len(canon_choices)
+    for scorer in (fuzz.token_set_ratio, fuzz.partial_ratio):
+        for _, sc, i in process.extract(q, canon_choices, scorer=scorer, processor=None,
+                                        limit=None, score_cutoff=cutoff):
+            if sc > scores[i]:
+                scores[i] = sc
+    return scores
+
+
+def best_match(query, choices, cutoff=0):
+    """
+    (índice, puntuación) del mejor candidato; ante empate gana el primero, como en los
+    bucles originales. (None, -1) si la lista está vacía o nadie llega a `cutoff`.
+    """
+    best_i, best = None, -1
+    for i, sc in enumerate(score_many(query, choices, cutoff)):
+        if sc > best and sc >= cutoff:
+            best_i, best = i, sc
+    return best_i, best
+
+
+def first_match(query, choices, threshold=80):
+    """Índice del primer candidato que pasa `threshold`, o None."""
+    for i, sc in enumerate(score_many(query, choices, threshold)):
+        if sc >= threshold:
+            return i
+    return None
@@ -0,0 +1,167 @@
+import os, io, json, gzip, lzma, tarfile, threading
+from matching import canon
+from localdb import connect, Lazy
+
+# Índice local a partir de los volcados JSON de MusicBrainz (https://data.metabrainz.org/pub/musicbrainz/data/json-dumps/):
+# artista y título canónicos -> releases con su fecha, eventos y release-group (con
+# first-release-date). Las fuentes de MusicBrainz lo consultan antes de ir a la red, así
+# que lo que está en el volcado se resuelve sin peticiones. Se crea con:
+#     python app.py mb-import --dump release.tar.xz        (o release-group.tar.xz, .jsonl, .jsonl.gz, ...)
+# y se puede importar sólo un subconjunto (p.ej. un grep por artistas de la colección).
+
+DB_PATH = "data/musicbrainz_dump.sqlite"
+BATCH = 5000
+
+
+def active(path=DB_PATH):
+    return os.path.exists(path)
+
+
+def _credit_names(ac):
+    """Nombres canónicos con los que buscar un artist-credit: el acreditado y el del artista."""
+    names = set()
+    for c in ac or []:
+        for n in (c.get("name"), (c.get("artist") or {}).get("name")):
+            if n:
+                names.add(canon(n))
+        break   # como las búsquedas: cuenta el primer artista acreditado
+    full = "".join((c.get("name") or "") + (c.get("joinphrase") or "") for c in ac or [])
+    if full:
+        names.add(canon(full))
+    names.discard("")
+    return names
+
+
+def _open_lines(path):
+    """Líneas JSON de un volcado: .jsonl, .gz, .xz o un .tar(.xz/.gz) con mbdump/<entidad> dentro."""
+    if ".tar" in os.path.basename(path):
+        with tarfile.open(path, "r|*") as tar:   # en streaming: no se descomprime a disco
+            for member in tar:
+                if member.isfile() and member.name.startswith("mbdump/"):
+                    f = tar.extractfile(member)
+                    for line in io.TextIOWrapper(f, encoding="utf-8"):
+                        yield line
+        return
+    opener = gzip.open if path.endswith(".gz") else lzma.open if path.endswith(".xz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        yield from f
+
+
+class DumpIndex:
+    def __init__(self, path=DB_PATH):
+        self.lock = threading.Lock()
+        self.db = connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS releases (
+                artist  TEXT NOT NULL,     -- canon() del artista
+                title   TEXT NOT NULL,     -- canon() del título
+                mbid    TEXT NOT NULL,
+                rg_mbid TEXT,
+                name    TEXT,              -- título tal cual
+                credit  TEXT,              -- artist-credit tal cual
+                date    TEXT,
+                events  TEXT,              -- fechas de release-events separadas por comas
+                PRIMARY KEY (artist, title, mbid)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS release_groups (
+                rg_mbid            TEXT PRIMARY KEY,
+                artist             TEXT,
+                title              TEXT,
+                first_release_date TEXT
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS release_groups_key ON release_groups(artist, title);
+        """)
+        self.db.commit()
+
+    # --- importación ---
+    def _rows(self, lines):
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                js = json.loads(line)
+            except ValueError:
+                continue
+            ac = js.get("artist-credit") or []
+            credit = "".join((c.get("name") or "") + (c.get("joinphrase") or "") for c in ac)
+            rg = js.get("release-group")
+            if rg is not None:   # volcado de releases
+                events = ",".join(e["date"] for e in js.get("release-events") or [] if e.get("date"))
+                rel = (canon(js.get("title") or ""), js["id"], rg.get("id"), js.get("title"), credit,
+                       js.get("date") or None, events or None)
+                group = (rg.get("id"), canon(rg.get("title") or ""), rg.get("first-release-date") or None)
+            elif "first-release-date" in js or "primary-type" in js:   # volcado de release-groups
+                rel, group = None, (js["id"], canon(js.get("title") or ""), js.get("first-release-date") or None)
+            else:
+                continue
+            yield _credit_names(ac), rel, group
+
+    def import_lines(self, lines):
+        """Importa en lotes (una transacción por lote). Devuelve (releases, release-groups) leídos."""
+        n_rel = n_rg = 0
+        rels, groups = [], []
+
+        def flush():
+            with self.lock, self.db:
+                self.db.executemany("INSERT OR REPLACE INTO releases VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rels)
+                self.db.executemany("""
+                    INSERT INTO release_groups VALUES (?, ?, ?, ?)
+                    ON CONFLICT (rg_mbid) DO UPDATE SET
+                        first_release_date = COALESCE(excluded.first_release_date, first_release_date)""", groups)
+            rels.clear()
+            groups.clear()
+
+        for names, rel, group in self._rows(lines):
+            artist = min(names) if names else ""
+            if rel is not None:
+                n_rel += 1
+                rels.extend((a, *rel) for a in names)
+            if group[0]:
+                n_rg += rel is None
+                groups.append((group[0], artist, group[1], group[2]))
+            if len(rels) + len(groups) >= BATCH:
+                flush()
+        flush()
+        return n_rel, n_rg
+
+    def import_dump(self, path):
+        return self.import_lines(_open_lines(path))
+
+    # --- consultas ---
+    def releases(self, artist, title):
+        """
+        Releases del volcado para (artista, título) con la forma de la búsqueda de la API
+        (title, date, artist-credit, release-events, release-group), o [] si no hay.
+        """
+        with self.lock:
+            rows = self.db.execute("""
+                SELECT r.mbid, r.rg_mbid, r.name, r.credit, r.date, r.events, g.first_release_date
+                FROM releases r LEFT JOIN release_groups g ON g.rg_mbid = r.rg_mbid
+                WHERE r.artist = ? AND r.title = ?""", (canon(artist), canon(title))).fetchall()
+        return [{"id": mbid, "title": name, "date": date or "",
+                 "artist-credit": [{"name": credit}],
+                 "release-events": [{"date": d} for d in (events or "").split(",") if d],
+                 "release-group": {"id": rg, "first-release-date": first or ""}}
+                for mbid, rg, name, credit, date, events, first in rows]
+
+    def release_group(self, rg_mbid):
+        """{'id', 'first-release-date', 'releases': [{'id', 'date'}]} o None."""
+        with self.lock:
+            row = self.db.execute("SELECT first_release_date FROM release_groups WHERE rg_mbid = ?",
+                                  (rg_mbid,)).fetchone()
+            rels = self.db.execute("SELECT DISTINCT mbid, date FROM releases WHERE rg_mbid = ?",
+                                   (rg_mbid,)).fetchall()
+        if row is None and not rels:
+            return None
+        return {"id": rg_mbid, "first-release-date": (row[0] if row else None) or "",
+                "releases": [{"id": m, "date": d or ""} for m, d in rels]}
+
+    def counts(self):
+        with self.lock:
+            return (self.db.execute("SELECT COUNT(DISTINCT mbid) FROM releases").fetchone()[0],
+                    self.db.execute("SELECT COUNT(*) FROM release_groups").fetchone()[0])
+
+
+# índice del volcado, o None mientras no se haya importado ninguno
+get_index = Lazy(DumpIndex, when=active)
@@ -0,0 +1,170 @@
+import os, json, time, bisect, threading
+from contextvars import ContextVar
+from contextlib import contextmanager
+from functools import wraps
+
+# Métricas por fuente de find_release_date: peticiones, aciertos/fallos de caché, bytes,
+# tiempo de parseo, histogramas de latencia y resultados (fecha completa, parcial, victorias).
+# La fuente activa es por hilo o tarea asyncio (ContextVar): sources._run_source la fija
+# y net/anet/extract la leen.
+# Tras cada `enrich`/`retry-missing` se guarda en data/metrics.json (última ejecución) y
+# se añade una línea a data/metrics.history.jsonl; `python app.py stats` las muestra.
+
+METRICS_JSON = "data/metrics.json"
+HISTORY_JSONL = "data/metrics.history.jsonl"
+
+# límites superiores de los cubos de latencia (ms); el último cubo es "más que eso"
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+COUNTERS = ("calls", "full", "partial", "empty", "errors", "wins",
+            "requests", "cache_hits", "cache_misses", "bytes", "parse_ms")
+
+
+class Histogram:
+    def __init__(self, counts=None):
+        self.counts = list(counts or [0] * (len(BUCKETS_MS) + 1))
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def total(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """
+        Límite superior del cubo que contiene el cuantil q (None si está vacío). Si cae en
+        el último cubo, abierto, devuelve ">30000" (JSON válido, a diferencia de infinito).
+        """
+        n = self.total()
+        if not n:
+            return None
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= q * n:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"
+        return None
+
+
+class _Source:
+    def __init__(self):
+        self.c = dict.fromkeys(COUNTERS, 0)
+        self.call_ms = Histogram()      # duración de la llamada a la fuente completa
+        self.request_ms = Histogram()   # duración de cada petición HTTP real (sin caché)
+
+    def as_dict(self):
+        return {**self.c,
+                "call_ms": {"buckets": BUCKETS_MS, "counts": self.call_ms.counts,
+                            "p50": self.call_ms.quantile(0.5), "p95": self.call_ms.quantile(0.95)},
+                "request_ms": {"buckets": BUCKETS_MS, "counts": self.request_ms.counts,
+                               "p50": self.request_ms.quantile(0.5), "p95": self.request_ms.quantile(0.95)}}
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._source = ContextVar("metrics_source", default=None)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.sources = {}
+            self.started = time.time()
+
+    def _src(self, name):
+        s = self.sources.get(name)
+        if s is None:
+            s = self.sources[name] = _Source()
+        return s
+
+    # --- fuente activa del hilo o de la tarea ---
+    def current(self):
+        return self._source.get() or "other"
+
+    @contextmanager
+    def source(self, name):
+        token = self._source.set(name)
+        try:
+            yield
+        finally:
+            self._source.reset(token)
+
+    # --- registro ---
+    def count(self, field, n=1, source=None):
+        with self.lock:
+            self._src(source or self.current()).c[field] += n
+
+    def cache(self, hit):
+        self.count("cache_hits" if hit else "cache_misses")
+
+    def request(self, ms, nbytes):
+        with self.lock:
+            s = self._src(self.current())
+            s.c["requests"] += 1
+            s.c["bytes"] += nbytes
+            s.request_ms.add(ms)
+
+    def call(self, name, ms, outcome):
+        """outcome: 'full', 'partial', 'empty' o 'errors'."""
+        with self.lock:
+            s = self._src(name)
+            s.c["calls"] += 1
+            s.c[outcome] += 1
+            s.call_ms.add(ms)
+
+    def timed_parse(self, fn):
+        """Decorador: suma el tiempo de fn al parse_ms de la fuente activa."""
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.count("parse_ms", (time.perf_counter() - t) * 1000)
+        return wrapper
+
+    # --- salida ---
+    def snapshot(self, run=None, **extra):
+        with self.lock:
+            return {"run": run, "started": self.started, "finished": time.time(), **extra,
+                    "sources": {name: s.as_dict() for name, s in sorted(self.sources.items())}}
+
+    def save(self, run, path=METRICS_JSON, history=HISTORY_JSONL, **extra):
+        snap = self.snapshot(run, **extra)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        with open(history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snap, ensure_ascii=False) + "\n")
+        return snap
+
+
+METRICS = Metrics()
+
+
+def load(path=METRICS_JSON):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _ms(v):
+    return "-" if v is None else (v if isinstance(v, str) else f"≤{v:g}")
+
+
+def format_table(snap):
+    """Tabla de texto de un snapshot (lo que imprime `app.py stats`)."""
+    head = (f"{'fuente':<40} {'llam.':>6} {'compl.':>7} {'parc.':>6} {'gana':>5} {'pet.':>6} "
+            f"{'caché':>6} {'KiB':>8} {'parse ms':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    lines = [head, "-" * len(head)]
+    for name, s in snap["sources"].items():
+        calls = s["calls"] or 0
+        pct = lambda k: f"{100 * s[k] / calls:5.1f}%" if calls else "    -"
+        lookups = s["cache_hits"] + s["cache_misses"]
+        hit = f"{100 * s['cache_hits'] / lookups:5.1f}%" if lookups else "    -"
+        lines.append(f"{name[:40]:<40} {calls:>6} {pct('full'):>7} {pct('partial'):>6} {s['wins']:>5} "
+                     f"{s['requests']:>6} {hit:>6} {s['bytes'] / 1024:>8.0f} {s['parse_ms']:>9.0f} "
+                     f"{_ms(s['call_ms']['p50']):>7} {_ms(s['call_ms']['p95']):>7}")
+    return "\n".join(lines)
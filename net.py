@@ -0,0 +1,201 @@
+import os, time, threading
+from functools import wraps
+from pathlib import Path
+from throttle import SCHEDULER, retry_after
+from metrics import METRICS
+
+# Capa HTTP única para todas las fuentes: sesión con pool de conexiones, caché sqlite,
+# reintentos y planificador por host (throttle.py).
+# La sesión (y requests/requests-cache) se crea en la primera petición: importar este
+# módulo no abre la caché ni carga la pila HTTP.
+
+# TTL de caché por tipo de recurso (segundos).
+# Las búsquedas cambian a menudo; las páginas de álbum y los lookups por id casi nunca.
+TTL = {
+    "search": 86400,          # 1 día
+    "lookup": 7 * 86400,      # 1 semana (MusicBrainz por MBID, discografías)
+    "page":   30 * 86400,     # 30 días (páginas de álbum)
+}
+
+_S = None
+_S_LOCK = threading.Lock()
+_POOL_SIZE = 12
+CACHED = None   # se sabe al crear la sesión
+
+def session():
+    """La sesión compartida; se crea (con la caché en data/) la primera vez que se pide."""
+    global _S, CACHED
+    with _S_LOCK:
+        if _S is not None:
+            return _S
+        import requests
+        # Crear carpeta data/ si no existe (para el archivo de caché)
+        Path("data").mkdir(parents=True, exist_ok=True)
+        try:
+            import requests_cache  # pip install requests-cache
+            # Al expirar, si la respuesta guardada trae ETag/Last-Modified, requests-cache
+            # revalida con If-None-Match/If-Modified-Since y un 304 renueva la entrada sin descargar.
+            s = requests_cache.CachedSession(
+                "data/http_cache",      # archivo sqlite en data/
+                backend="sqlite",
+                expire_after=TTL["search"],
+                allowable_methods=("GET",),
+                stale_if_error=True,
+            )
+            CACHED = True
+        except Exception as e:
+            # Si no está instalado o falla la caché, seguimos sin caché
+            # print(f"[cache deshabilitada] {e}")  # <- opcional para depurar
+            s = requests.Session()
+            CACHED = False
+        s.headers.update({"User-Agent": "discogs-anniv-bot/1.1"})
+        _mount(s, _POOL_SIZE)
+        _S = s
+        return s
+
+DEFAULT_TIMEOUT = 20
+THROTTLED = (429, 503)
+
+# Redirección a un servidor local (bench/fake_services.py): con ANNIV_REDIRECT=http://127.0.0.1:8765
+# https://musicbrainz.org/ws/2/... se pide a http://127.0.0.1:8765/musicbrainz.org/ws/2/...
+# Los presupuestos por host se siguen aplicando con la URL original.
+REDIRECT = os.getenv("ANNIV_REDIRECT", "").rstrip("/")
+
+def _target(url):
+    if not REDIRECT or url.startswith(REDIRECT + "/"):
+        return url
+    _, sep, rest = url.partition("://")
+    return f"{REDIRECT}/{rest}" if sep else url
+
+
+def _mount(s, pool_size):
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    # 429/503 no se reintentan aquí: los gestiona el planificador por host (throttle.py)
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 504])
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=16, pool_maxsize=max(1, pool_size))
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+
+def configure(pool_size=12):
+    """Ajusta el pool de conexiones al número de workers de enriquecimiento."""
+    global _POOL_SIZE
+    with _S_LOCK:
+        _POOL_SIZE = pool_size
+        if _S is not None:
+            _mount(_S, pool_size)
+
+
+class Cancelled(Exception):
+    """La consulta ya no hace falta (otra fuente ganó la carrera)."""
+
+
+_local = threading.local()
+
+def set_cancel(event):
+    """Asocia al hilo actual un threading.Event; si se activa, GET deja de hacer peticiones."""
+    _local.cancel = event
+
+def requests_made():
+    """Peticiones HTTP reales (sin caché) hechas por el hilo actual."""
+    return getattr(_local, "requests", 0)
+
+def _check_cancel():
+    ev = getattr(_local, "cancel", None)
+    if ev is not None and ev.is_set():
+        raise Cancelled()
+
+
+def _scheduled(url, attempts=3, **kwargs):
+    # cada petición pasa por el presupuesto de su host; si el host nos frena,
+    # se bloquea sólo ese host durante Retry-After y se reintenta
+    for _ in range(attempts):
+        _check_cancel()
+        with SCHEDULER.slot(url):
+            _check_cancel()
+            t = time.perf_counter()
+            r = session().get(_target(url), **kwargs)
+        _local.requests = requests_made() + 1
+        # revalidaciones 304 servidas por requests-cache no descargan el cuerpo
+        revalidated = getattr(r, "from_cache", False)
+        METRICS.request((time.perf_counter() - t) * 1000, 0 if revalidated else len(r.content))
+        if r.status_code not in THROTTLED:
+            return r
+        SCHEDULER.backoff(url, retry_after(r))
+    return r
+
+
+def GET(url, ttl="page", **kwargs):
+    """
+    GET cacheado. `ttl` es una clave de TTL ("search", "lookup", "page") o segundos.
+    Las respuestas servidas desde caché no consumen presupuesto del host.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    _check_cancel()
+    s = session()
+    if not CACHED:
+        return _scheduled(url, **kwargs)
+    expire = TTL.get(ttl, ttl) if isinstance(ttl, str) else ttl
+    r = s.get(_target(url), only_if_cached=True, expire_after=expire, **kwargs)
+    # con stale_if_error la sesión devuelve entradas caducadas en vez de 504: eso es un
+    # fallo de caché, y _scheduled revalida (If-None-Match/If-Modified-Since) o descarga
+    hit = r.status_code != 504 and not getattr(r, "is_expired", False)
+    METRICS.cache(hit=hit)
+    if hit:
+        return r
+    return _scheduled(url, expire_after=expire, **kwargs)
+
+
+# ---------- fuentes escritas como generadores ----------
+# Las fuentes de sources.py no llaman a GET: piden cada petición con `r = yield Fetch(...)`
+# (y las esperas a otra fuente con `yield Wait(evento)`). Quien recorre el generador decide
+# cómo se hace: run() con GET bloqueante (motor de hilos) o anet.run() con aiohttp (motor
+# asyncio). Así cada fuente se escribe una sola vez para los dos motores.
+class Fetch:
+    """Petición GET pedida por una fuente; mismos argumentos que GET."""
+    __slots__ = ("url", "ttl", "kwargs")
+
+    def __init__(self, url, ttl="page", **kwargs):
+        self.url, self.ttl, self.kwargs = url, ttl, kwargs
+
+
+class Wait:
+    """Espera a que otra fuente termine algo compartido (un threading.Event)."""
+    __slots__ = ("event",)
+
+    def __init__(self, event):
+        self.event = event
+
+
+def run(steps):
+    """Recorre una fuente-generador haciendo sus peticiones con GET; devuelve su resultado."""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                if isinstance(step, Wait):
+                    out = step.event.wait()
+                else:
+                    out = GET(step.url, step.ttl, **step.kwargs)
+            except Exception as e:
+                # el error llega a la fuente en su `yield`, como si GET lo hubiera lanzado allí
+                step = steps.throw(e)
+            else:
+                step = steps.send(out)
+    except StopIteration as stop:
+        return stop.value
+    finally:
+        steps.close()
+
+
+def driven(gen_fn):
+    """
+    Decorador de fuentes-generador: la función se sigue llamando como siempre (con GET
+    bloqueante) y el generador queda en `.steps` para componer fuentes (`yield from`)
+    o para ejecutarlo en asyncio (anet.run).
+    """
+    @wraps(gen_fn)
+    def call(*args, **kwargs):
+        return run(gen_fn(*args, **kwargs))
+    call.steps = gen_fn
+    return call
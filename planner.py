@@ -0,0 +1,104 @@
+import os, threading
+from matching import canon
+from localdb import connect, Lazy
+
+# Orden adaptativo de fuentes para find_release_date. Por cada fuente probada se guarda
+# el resultado (fecha completa, parcial o nada) y cuántas peticiones HTTP costó, agregado
+# por rasgo del ítem: artista, sello y formato. Para un ítem nuevo se estima, por fuente,
+# la probabilidad de fecha completa y el coste medio, y se ordena por coste/probabilidad
+# (lo que minimiza las peticiones esperadas hasta la primera fecha completa).
+# Sin datos suficientes se mantiene el orden fijo de _source_calls.
+
+DB_PATH = "data/planner.sqlite"
+ENABLED = os.getenv("ANNIV_PLANNER", "1") != "0"
+
+MIN_EVIDENCE = 3     # intentos mínimos con un rasgo para que cuente
+SKIP_AFTER = 8       # intentos del mismo artista sin ninguna fecha para saltar la fuente
+PRIOR_WEIGHT = 4.0   # peso (en intentos) del total global frente al rasgo
+
+
+def features(artist, labels=(), formats=()):
+    """Rasgos del ítem, del más específico al más general."""
+    out = []
+    if artist:
+        out.append("artist:" + canon(artist))
+    out += ["label:" + canon(l) for l in labels or () if l]
+    out += ["format:" + f.strip().lower() for f in formats or () if f]
+    return out
+
+
+class SourcePlanner:
+    def __init__(self, path=DB_PATH):
+        self.lock = threading.Lock()
+        self.db = connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outcomes (
+                feature  TEXT,            -- 'artist:...', 'label:...', 'format:...' o '*'
+                source   TEXT,
+                tries    INTEGER DEFAULT 0,
+                full     INTEGER DEFAULT 0,
+                partial  INTEGER DEFAULT 0,
+                requests INTEGER DEFAULT 0,
+                PRIMARY KEY (feature, source)
+            )""")
+        self.db.commit()
+
+    def record(self, feats, source, outcome, requests):
+        """outcome: 'full', 'partial' o None. Se suma al rasgo global '*' y a cada rasgo del ítem."""
+        full, partial = outcome == "full", outcome == "partial"
+        with self.lock, self.db:
+            self.db.executemany("""
+                INSERT INTO outcomes (feature, source, tries, full, partial, requests) VALUES (?, ?, 1, ?, ?, ?)
+                ON CONFLICT (feature, source) DO UPDATE SET
+                    tries = tries + 1, full = full + excluded.full,
+                    partial = partial + excluded.partial, requests = requests + excluded.requests""",
+                [(f, source, full, partial, requests) for f in ["*", *feats]])
+
+    def _stats(self, feats):
+        keys = ["*", *feats]
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT feature, source, tries, full, partial, requests FROM outcomes "
+                f"WHERE feature IN ({','.join('?' * len(keys))})", keys).fetchall()
+        stats = {}
+        for feature, source, tries, full, partial, requests in rows:
+            stats.setdefault(source, {})[feature] = (tries, full, partial, requests)
+        return stats
+
+    def plan(self, names, feats):
+        """
+        Orden (y descartes) para las fuentes `names` (en su orden por defecto).
+        Devuelve la lista de nombres a probar. Determinista: a igualdad de estimación
+        se respeta el orden por defecto, y sin historial se devuelve tal cual.
+        """
+        stats = self._stats(feats)
+        keyed = []
+        for i, name in enumerate(names):
+            per = stats.get(name, {})
+            g_tries, g_full, _, g_req = per.get("*", (0, 0, 0, 0))
+            if g_tries < MIN_EVIDENCE:
+                keyed.append((0, i, name))   # fuente sin historial: se queda en su sitio
+                continue
+            # p(completa) y coste: el global suavizado con lo visto en cada rasgo del ítem
+            p_prior, c_prior = g_full / g_tries, g_req / g_tries
+            w, full, req = PRIOR_WEIGHT, PRIOR_WEIGHT * p_prior, PRIOR_WEIGHT * c_prior
+            for f in feats:
+                tries, f_full, f_partial, f_req = per.get(f, (0, 0, 0, 0))
+                if f.startswith("artist:") and tries >= SKIP_AFTER and not (f_full or f_partial):
+                    break   # este artista nunca ha tenido fecha aquí: se salta la fuente
+                if tries >= MIN_EVIDENCE:
+                    w, full, req = w + tries, full + f_full, req + f_req
+            else:
+                p, cost = full / w, max(req / w, 0.1)   # lo cacheado no es gratis del todo
+                keyed.append((1, cost / p if p > 0 else float("inf"), i, name))
+        # primero las fuentes que ya han dado fechas, por coste esperado; luego las que aún no
+        # tienen historial (en su orden por defecto) y al final las que nunca dieron fecha completa
+        known = sorted((k for k in keyed if k[0] == 1), key=lambda k: (k[1], k[2]))
+        fresh = [name for _, _, name in (k for k in keyed if k[0] == 0)]
+        ordered = ([name for _, ratio, _, name in known if ratio != float("inf")] + fresh +
+                   [name for _, ratio, _, name in known if ratio == float("inf")])
+        # nunca quedarse sin fuentes: si todo se descartaría, orden por defecto
+        return ordered or list(names)
+
+
+get_planner = Lazy(SourcePlanner)
@@ -0,0 +1,81 @@
+import os, json, time, threading
+from localdb import connect, Lazy
+
+# Resultado final de find_release_date por (artista, título) normalizados.
+# A diferencia de la caché HTTP, no caduca para fechas completas; los fallos y las
+# fechas parciales se vuelven a intentar con back-off exponencial: MISS_TTL tras el
+# primer intento fallido, el doble tras el segundo, ... hasta MAX_BACKOFF.
+
+DB_PATH = "data/resolutions.sqlite"
+MISS_TTL = float(os.getenv("ANNIV_MISS_TTL_DAYS", "7")) * 86400
+MAX_BACKOFF = float(os.getenv("ANNIV_MAX_BACKOFF_DAYS", "180")) * 86400
+
+
+class ResolutionStore:
+    def __init__(self, path=DB_PATH, miss_ttl=MISS_TTL, max_backoff=MAX_BACKOFF):
+        self.miss_ttl = miss_ttl
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.db = connect(path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS resolutions (
+                key         TEXT PRIMARY KEY,
+                artist      TEXT,
+                title       TEXT,
+                date        TEXT,
+                source      TEXT,
+                url         TEXT,
+                tried       TEXT,
+                resolved_at REAL,
+                retry_at    REAL
+            )""")
+        # historial de intentos e ids fijados (añadidos después: se migra la tabla si hace falta)
+        cols = {r[1] for r in self.db.execute("PRAGMA table_info(resolutions)")}
+        for col, decl in (("attempts", "INTEGER DEFAULT 0"), ("mbid", "TEXT"), ("rg_mbid", "TEXT"),
+                          ("bandcamp_url", "TEXT")):
+            if col not in cols:
+                self.db.execute(f"ALTER TABLE resolutions ADD COLUMN {col} {decl}")
+        self.db.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT date, source, url, tried, resolved_at, retry_at, attempts, mbid, rg_mbid, bandcamp_url "
+                "FROM resolutions WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        date, source, url, tried, resolved_at, retry_at, attempts, mbid, rg_mbid, bandcamp_url = row
+        # resolved_at es también la hora del último intento
+        pins = {k: v for k, v in (("mbid", mbid), ("rg_mbid", rg_mbid), ("bandcamp_url", bandcamp_url)) if v}
+        return {"date": date, "source": source, "url": url, "tried": json.loads(tried or "[]"),
+                "resolved_at": resolved_at, "retry_at": retry_at, "attempts": attempts or 0, "pins": pins}
+
+    def backoff(self, attempts):
+        """Espera antes del siguiente intento tras `attempts` intentos fallidos seguidos."""
+        return min(self.miss_ttl * 2 ** max(attempts - 1, 0), self.max_backoff)
+
+    def put(self, key, artist, title, result, tried, full, pins=None):
+        """`pins`: MBIDs / URL de Bandcamp emparejados; los ya guardados se conservan si no llegan nuevos."""
+        now = time.time()
+        result = result or {}
+        pins = pins or {}
+        with self.lock:
+            prev = self.db.execute("SELECT tried, attempts, mbid, rg_mbid, bandcamp_url FROM resolutions WHERE key = ?",
+                                   (key,)).fetchone()
+            tried = set(tried) | set(json.loads(prev[0] or "[]") if prev else [])
+            attempts = (prev[1] or 0) + 1 if prev else 1
+            old_pins = dict(zip(("mbid", "rg_mbid", "bandcamp_url"), prev[2:])) if prev else {}
+            # fecha completa: definitiva; parcial o nada: se reintenta tras el back-off
+            retry_at = None if full else now + self.backoff(attempts)
+            self.db.execute("""
+                INSERT OR REPLACE INTO resolutions
+                    (key, artist, title, date, source, url, tried, resolved_at, retry_at, attempts,
+                     mbid, rg_mbid, bandcamp_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, artist, title, result.get("date"), result.get("source"), result.get("url"),
+                 json.dumps(sorted(tried)), now, retry_at, attempts,
+                 *(pins.get(k) or old_pins.get(k) for k in ("mbid", "rg_mbid", "bandcamp_url"))))
+            self.db.commit()
+
+
+get_store = Lazy(ResolutionStore)
@@ -1,113 +1,68 @@
-import re, json, requests
-from bs4 import BeautifulSoup
-from rapidfuzz import fuzz
-from unidecode import unidecode
-import dateparser
-import requests
-from pathlib import Path
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-# Crear carpeta data/ si no existe (para el archivo de caché)
-Path("data").mkdir(parents=True, exist_ok=True)
-
-try:
-    import requests_cache  # pip install requests-cache
-    S = requests_cache.CachedSession(
-        "data/http_cache",      # archivo sqlite en data/
-        backend="sqlite",
-        expire_after=86400,     # 24 h
-        allowable_methods=("GET",),
-        stale_if_error=True,
-    )
-except Exception as e:
-    # Si no está instalado o falla la caché, seguimos sin caché
-    # print(f"[cache deshabilitada] {e}")  # <- opcional para depurar
-    S = requests.Session()
-
-S.headers.update({"User-Agent": "discogs-anniv-bot/1.1"})
-retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
-S.mount("https://", HTTPAdapter(max_retries=retry))
-S.mount("http://", HTTPAdapter(max_retries=retry))
-
-DEFAULT_TIMEOUT = 20
-def GET(url, **kwargs):
-    timeout = kwargs.pop("timeout", DEFAULT_TIMEOUT)
-    return S.get(url, timeout=timeout, **kwargs)
-
+import re, json, threading, time, asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import net
+import extract
+from net import Fetch, Wait, driven
+from resolutions import get_store
+from ma_index import get_index as get_ma_index
+from mb_dump import get_index as get_mb_dump
+from dates import parse_date
+from matching import canon, score, ok, score_many, best_match, first_match
+from metrics import METRICS
+import planner
+from discogs_client import release_date as discogs_release_date
 
 
 UA = {"User-Agent": "discogs-anniv-bot/1.0"}
 
 
-def _canon(s: str) -> str:
-    s = unidecode((s or "").lower())
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    return " ".join(s.split())
-
-def _fuzzy(a: str, b: str) -> int:
-    A, B = _canon(a), _canon(b)
-    return max(fuzz.token_set_ratio(A, B), fuzz.partial_ratio(A, B))
-
-def _ok(a, b, threshold=80):
-    return _fuzzy(a, b) >= threshold
-
-def _fuzzy_score(a: str, b: str) -> int:
-    A, B = _canon(a), _canon(b)
-    # mezcla de métricas para ser tolerantes con apóstrofes/guiones
-    return max(
-        fuzz.token_set_ratio(A, B),
-        fuzz.partial_ratio(A, B)
-    )
-
-def _ok(a, b, threshold=80):
-    return _fuzzy_score(a, b) >= threshold
+# canonización y fuzzy viven en matching.py (formas canónicas memoizadas, scoring por lotes)
+_canon = canon
+_fuzzy = _fuzzy_score = score
+_ok = ok
 
 
 def _norm(s: str) -> str:
     return (s or "").strip().lower()
 
-def _parse_date(text: str):
-    if not text:
-        return None
-    dt = dateparser.parse(
-        text,
-        settings={"PREFER_DAY_OF_MONTH": "first", "RETURN_AS_TIMEZONE_AWARE": False}
-    )
-    return dt.date().isoformat() if dt else None
+# vía rápida + memoización; dateparser sólo se importa si hace falta (dates.py)
+_parse_date = parse_date
 
 
 # ---------- Wikipedia ----------
+# Las fuentes son generadores (ver net.driven): cada `yield Fetch(...)` es una petición
+# que hace el motor, con GET bloqueante o con anet en asyncio.
+@driven
 def wikipedia_release_date(artist, title):
     # 1) buscar página candidata (igual que antes)
     q = f'{title} (album)'
-    r = requests.get(
-        "https://en.wikipedia.org/w/api.php",
+    r = yield Fetch(
+        "https://en.wikipedia.org/w/api.php", ttl="search",
         params={"action":"query","list":"search","format":"json","srsearch":q, "srlimit":5},
         headers=UA, timeout=30
     )
     r.raise_for_status()
     hits = r.json().get("query", {}).get("search", [])
     best = None
-    for h in hits:
-        if _ok(h.get("title",""), f"{title}"):
-            best = h["title"]; break
+    i = first_match(title, [h.get("title","") for h in hits])
+    if i is not None:
+        best = hits[i]["title"]
     if not best and hits:
         best = hits[0]["title"]
 
     if not best:
         # fallback: 'artist title album'
         q = f'{artist} {title} album'
-        r = requests.get(
-            "https://en.wikipedia.org/w/api.php",
+        r = yield Fetch(
+            "https://en.wikipedia.org/w/api.php", ttl="search",
             params={"action":"query","list":"search","format":"json","srsearch":q, "srlimit":5},
             headers=UA, timeout=30
         )
         r.raise_for_status()
         hits = r.json().get("query", {}).get("search", [])
-        for h in hits:
-            if _ok(h.get("title",""), f"{title}"):
-                best = h["title"]; break
+        i = first_match(title, [h.get("title","") for h in hits])
+        if i is not None:
+            best = hits[i]["title"]
         if not best and hits:
             best = hits[0]["title"]
 
@@ -115,61 +70,307 @@ def wikipedia_release_date(artist, title):
         return None
 
     # 2) leer página
-    r = requests.get(f"https://en.wikipedia.org/wiki/{best.replace(' ', '_')}", headers=UA, timeout=30)
+    r = yield Fetch(f"https://en.wikipedia.org/wiki/{best.replace(' ', '_')}", headers=UA, timeout=30)
     if r.status_code != 200:
         return None
-    soup = BeautifulSoup(r.text, "lxml")
+    # sólo se parsean el <h1> y la infobox, no el artículo entero
+    page_title, txt = extract.wikipedia_title_and_released(r.text)
 
     # ✅ validar que realmente es la página del álbum correcto
-    h1 = soup.select_one("#firstHeading")
-    page_title = h1.get_text(strip=True) if h1 else best
-    if not _ok(page_title, title):
+    if not _ok(page_title or best, title):
         return None  # no arriesgarse a tomar fechas de otra cosa
 
     # 3) tomar fecha SOLO de la infobox ("Released"/"Release date")
-    infobox = soup.select_one(".infobox")
-    if not infobox:
-        return None
+    if txt is None:
+        return None  # sin fallback de escaneo global
+    return _parse_date(txt)
 
-    for lab in infobox.select("tr th"):
-        if lab.get_text(strip=True).lower() in {"released", "release date"}:
-            val = lab.find_next("td")
-            if not val:
-                continue
-            for sup in val.select("sup"):
-                sup.decompose()
-            txt = val.get_text(" ", strip=True).split(";")[0]
-            return _parse_date(txt)
 
-    return None  # sin fallback de escaneo global
+# ---------- MusicBrainz ----------
+# Una sola búsqueda de releases por (artista, título), compartida por
+# musicbrainz_label_event_date y musicbrainz_release_date. Las entradas en curso se
+# marcan con un Event para que dos hilos o corrutinas (p.ej. en modo carrera) no repitan
+# la petición: el segundo espera con `yield Wait(evento)`.
+# Cada entrada se borra en cuanto la han usado las dos fuentes (_MB_USERS), y como
+# mucho se guardan MB_SEARCH_MAX resueltas (se descartan las más antiguas): la memoria
+# no crece con la colección.
+MB_SEARCH_LIMIT = 15
+MB_SEARCH_MAX = 2048
+_MB_USERS = frozenset({"release", "label_event"})
+_MB_SEARCH = {}
+_MB_LOCK = threading.Lock()
+
+def _mb_key(artist, title):
+    return _norm(artist), _norm(title)
+
+def _mb_claim(keys):
+    """Reserva las claves aún no buscadas; devuelve las que le toca rellenar al llamante."""
+    mine = []
+    with _MB_LOCK:
+        for k in keys:
+            if k not in _MB_SEARCH:
+                _MB_SEARCH[k] = {"event": threading.Event(), "releases": None}
+                mine.append(k)
+    return mine
+
+def _mb_fill(key, releases):
+    with _MB_LOCK:
+        entry = _MB_SEARCH[key]
+        if releases is None:
+            del _MB_SEARCH[key]  # fallo: que el próximo lo vuelva a intentar
+        else:
+            entry["releases"] = releases
+            entry["used"] = set()
+            _mb_evict()
+    entry["event"].set()
+
+def _mb_evict():
+    # con _MB_LOCK tomado; las entradas en curso (sin releases) no se tocan
+    excess = len(_MB_SEARCH) - MB_SEARCH_MAX
+    if excess > 0:
+        for k in [k for k, e in _MB_SEARCH.items() if e["releases"] is not None][:excess]:
+            del _MB_SEARCH[k]
+
+def _mb_used(key, user):
+    with _MB_LOCK:
+        entry = _MB_SEARCH.get(key)
+        if entry is not None and entry["releases"] is not None:
+            entry["used"].add(user)
+            if entry["used"] >= _MB_USERS:
+                del _MB_SEARCH[key]
+
+def _mb_local(artist, title):
+    """Releases del volcado local (mb_dump) para (artista, título), o None si no hay volcado o no está."""
+    idx = get_mb_dump()
+    return (idx.releases(artist, title) or None) if idx is not None else None
+
+@driven
+def _mb_release_search(artist, title, user):
+    """Releases de la búsqueda compartida; `user` es la fuente que la consume (ver _MB_USERS)."""
+    local = _mb_local(artist, title)
+    if local is not None:
+        return local
+    key = _mb_key(artist, title)
+    releases = yield from _mb_search_shared.steps(key, artist, title)
+    if releases is not None:
+        _mb_used(key, user)
+    return releases
+
+@driven
+def _mb_search_shared(key, artist, title):
+    if _mb_claim([key]):
+        releases = None
+        try:
+            r = yield Fetch("https://musicbrainz.org/ws/2/release", ttl="search", params={
+                "query": f'release:"{title}" AND artist:"{artist}"',
+                "fmt": "json", "limit": MB_SEARCH_LIMIT, "inc": "labels+release-groups+release-events"
+            }, headers=UA, timeout=30)
+            if r.status_code == 200:
+                releases = r.json().get("releases", [])
+        finally:
+            _mb_fill(key, releases)
+        return releases
+    with _MB_LOCK:
+        entry = _MB_SEARCH.get(key)
+    if entry is None:
+        return None
+    yield Wait(entry["event"])
+    return entry["releases"]
 
 
-# ---------- MusicBrainz ----------
+def _lucene_quote(s):
+    return (s or "").replace("\\", "\\\\").replace('"', '\\"')
+
+@driven
+def musicbrainz_prefetch(artist, titles, chunk=10, max_results=300):
+    """
+    Búsqueda por lotes: un OR de Lucene con varios títulos del mismo artista.
+    Cada release devuelto se asigna a los títulos con los que hace fuzzy match y
+    queda en la caché compartida, así que las búsquedas individuales ya no salen a la red.
+    """
+    by_key = {_mb_key(artist, t): t for t in titles if t and _mb_local(artist, t) is None}
+    mine = _mb_claim(list(by_key))
+    for i in range(0, len(mine), chunk):
+        keys = mine[i:i + chunk]
+        found = {k: [] for k in keys}
+        ok = False
+        try:
+            q = f'artist:"{_lucene_quote(artist)}" AND (' + \
+                " OR ".join(f'release:"{_lucene_quote(by_key[k])}"' for k in keys) + ")"
+            offset = 0
+            while True:
+                with METRICS.source("musicbrainz_prefetch"):
+                    r = yield Fetch("https://musicbrainz.org/ws/2/release", ttl="search", params={
+                        "query": q, "fmt": "json", "limit": 100, "offset": offset,
+                    }, headers=UA, timeout=30)
+                if r.status_code != 200:
+                    break
+                js = r.json()
+                rels = js.get("releases", [])
+                for rel in rels:
+                    t = rel.get("title", "")
+                    for k, sc in zip(keys, score_many(t, [by_key[k] for k in keys], 80)):
+                        if sc >= 80:
+                            found[k].append(rel)
+                offset += len(rels)
+                if not rels or offset >= js.get("count", 0):
+                    ok = True
+                    break
+                if offset >= max_results:
+                    # cortado antes del final: sólo se guardan los títulos con resultados;
+                    # el resto queda sin rellenar y se buscará título a título
+                    ok = "partial"
+                    break
+        finally:
+            for k in keys:
+                _mb_fill(k, found[k] if ok is True or (ok and found[k]) else None)
+
+
+def musicbrainz_batches(items, min_titles=2):
+    """Agrupa los ítems por artista (como los ve find_release_date) para musicbrainz_prefetch."""
+    groups = {}
+    for it in items:
+        artist = (it.get("artist") or it.get("artist_clean") or "").strip()
+        title = (it.get("title") or "").strip()
+        if artist and title:
+            groups.setdefault(artist, []).append(title)
+    return [(a, ts) for a, ts in groups.items() if len(ts) >= min_titles]
+
+
+@driven
 def musicbrainz_release_date(artist, title):
-    r = requests.get("https://musicbrainz.org/ws/2/release/", params={
-        "query": f'release:"{title}" AND artist:"{artist}"',
-        "fmt": "json", "limit": 10
-    }, headers=UA, timeout=30)
-    if r.status_code != 200:
+    releases = yield from _mb_release_search.steps(artist, title, "release")
+    if releases is None:
         return None
-    data = r.json()
     full, partial = [], []
-    for rel in data.get("releases", []):
+    # la búsqueda compartida trae 15; esta fuente siempre miró los 10 primeros
+    for rel in releases[:10]:
         t = rel.get("title","")
         arts = rel.get("artist-credit", [])
         aname = " ".join(ac.get("name","") for ac in arts)
         if _ok(t, title) and (_ok(aname, artist) or _ok(artist, aname)):
             d = rel.get("date")
             if d:
-                (full if _is_full_date(d) else partial).append(d)
+                (full if _is_full_date(d) else partial).append((d, rel))
+    return _mb_pick(full, partial)
+
+
+def _mb_pick(full, partial):
+    """
+    La fecha más temprana (completas antes que parciales) de [(fecha, release), ...],
+    con la URL del release y los MBIDs que la respaldan para fijarlos (ver musicbrainz_pinned_date).
+    """
+    for cands in (full, partial):
+        if cands:
+            d, rel = min(cands, key=lambda c: c[0])
+            pins = {"mbid": rel.get("id"), "rg_mbid": (rel.get("release-group") or {}).get("id")}
+            url = f"https://musicbrainz.org/release/{rel['id']}" if rel.get("id") else "https://musicbrainz.org"
+            return d, "musicbrainz", url, pins
+    return None
+
+
+@driven
+def musicbrainz_pinned_date(rg_mbid, bandcamp_url=None):
+    """
+    Refresco por id de un ítem ya emparejado antes: lookup directo del release-group
+    (first-release-date, fechas de sus releases y url-rels) en lugar de otra búsqueda
+    Lucene, y si hay enlace a Bandcamp fijado (o aparece ahora), su página.
+    Si el volcado local tiene el release-group con fecha completa, no sale a la red.
+    """
+    idx = get_mb_dump()
+    js = idx.release_group(rg_mbid) if idx is not None else None
+    if js is not None:
+        dates = [js["first-release-date"]] + [rel["date"] for rel in js["releases"]]
+        full = sorted(d for d in dates if d and _is_full_date(d))
+        if full:
+            return full[0], "musicbrainz", f"https://musicbrainz.org/release-group/{rg_mbid}", {"rg_mbid": rg_mbid}
+    r = yield Fetch(f"https://musicbrainz.org/ws/2/release-group/{rg_mbid}", ttl="lookup", params={
+        "fmt": "json", "inc": "releases+url-rels"
+    }, headers=UA, timeout=30)
+    if r.status_code != 200:
+        return None
+    js = r.json()
+    dates = [d for d in [js.get("first-release-date")] + [rel.get("date") for rel in js.get("releases") or []] if d]
+    full = sorted(d for d in dates if _is_full_date(d))
+    pins = {"rg_mbid": rg_mbid}
+    url = f"https://musicbrainz.org/release-group/{rg_mbid}"
     if full:
-        return sorted(full)[0], "musicbrainz", "https://musicbrainz.org"
-    if partial:
-        return sorted(partial)[0], "musicbrainz", "https://musicbrainz.org"
+        return full[0], "musicbrainz", url, pins
+    links = [bandcamp_url] if bandcamp_url else _bandcamp_links(js.get("relations") or [])
+    for link in links:
+        d = yield from _bandcamp_date.steps(link)
+        if d:
+            return d, "bandcamp", link, {**pins, "bandcamp_url": link}
+    if dates:
+        return sorted(dates)[0], "musicbrainz", url, pins
     return None
 
 
 # ---------- Metal Archives (best-effort scraping) ----------
+# Búsquedas, discografías y fechas de álbum se guardan en ma_index.BandIndex,
+# así que cada banda se busca y se parsea como mucho una vez por periodo de refresco.
+@driven
+def _ma_search_bands(band_name):
+    """[(band_url, nombre), ...] del buscador avanzado, o None si falla la petición."""
+    idx = get_ma_index()
+    rows = idx.search(band_name)
+    if rows is not None:
+        return rows
+    r = yield Fetch(
+        "https://www.metal-archives.com/search/ajax-advanced/searching/bands/", ttl="search",
+        params={"bandName": band_name, "exactBandMatch": 0, "page": 1},
+        headers=UA,
+    )
+    if r.status_code != 200:
+        return None
+    rows = []
+    for row in r.json().get("aaData") or []:
+        # row[0] es HTML con <a href="...">Nombre</a>
+        m = re.search(r'href="([^"]+)"[^>]*>(.*?)</a>', row[0])
+        if not m:
+            continue
+        rows.append((m.group(1), extract.fragment_text(m.group(2))))
+    idx.put_search(band_name, rows)
+    return rows
+
+
+@driven
+def _ma_discography(band_url):
+    """[(título, url_álbum, año), ...] de la discografía completa, o None si falla."""
+    idx = get_ma_index()
+    rows = idx.discography(band_url)
+    if rows is not None:
+        return rows
+    # band_url suele ser /bands/<Name>/<id>
+    disc_url = band_url.replace("/bands/", "/band/discography/id/") + "/tab/all"
+    r = yield Fetch(disc_url, ttl="lookup", headers=UA)
+    if r.status_code != 200:
+        return None
+    rows = extract.ma_discography_rows(r.text)
+    idx.put_discography(band_url, rows)
+    return rows
+
+
+@driven
+def _ma_album_date(album_url, band_url):
+    idx = get_ma_index()
+    found, d = idx.album_date(album_url)
+    if found:
+        return d
+    r = yield Fetch(album_url, headers=UA)
+    if r.status_code != 200:
+        return None
+    date_text = extract.ma_release_date_text(r.text)
+    if date_text:
+        # limpiar ordinales tipo "August 18th, 2016"
+        date_text = re.sub(r"(\d{1,2})(st|nd|rd|th)", r"\1", date_text)
+
+    d = _parse_date(date_text) if date_text else None
+    idx.put_album_date(album_url, band_url, d)
+    return d
+
+
+@driven
 def metal_archives_release_date(artist, title, artist_clean=None):
     """
     Busca la banda en Metal Archives (intentando primero el nombre original y luego el 'clean'),
@@ -179,92 +380,33 @@ def metal_archives_release_date(artist, title, artist_clean=None):
     # probamos ambos nombres para desambiguar homónimos (p.ej. "Odium (Nor)")
     for band_name in (artist, artist_clean or artist):
         # 1) Buscar banda
-        r = GET(
-            "https://www.metal-archives.com/search/ajax-advanced/searching/bands/",
-            params={"bandName": band_name, "exactBandMatch": 0, "page": 1},
-            headers=UA,
-        )
-        if r.status_code != 200:
-            continue
-        js = r.json()
-        aa = js.get("aaData") or []
-        if not aa:
+        bands = yield from _ma_search_bands.steps(band_name)
+        if not bands:
             continue
 
         # elegir la mejor banda por fuzzy score
-        best_band_url = None
-        best_band_score = -1
-        best_band_name = None
-        for row in aa:
-            # row[0] es HTML con <a href="...">Nombre</a>
-            m = re.search(r'href="([^"]+)"[^>]*>(.*?)</a>', row[0])
-            if not m:
-                continue
-            url = m.group(1)
-            disp = BeautifulSoup(m.group(2), "lxml").get_text()
-            score = _fuzzy_score(disp, band_name)
-            if score > best_band_score:
-                best_band_score = score
-                best_band_url = url
-                best_band_name = disp
-
         # umbral razonable; si no alcanza, probamos con el siguiente band_name
-        if not best_band_url or best_band_score < 70:
+        i, _ = best_match(band_name, [disp for _, disp in bands], cutoff=70)
+        if i is None or not bands[i][0]:
             continue
+        best_band_url = bands[i][0]
 
         # 2) Discografía completa
-        # best_band_url suele ser /bands/<Name>/<id>
-        disc_url = best_band_url.replace("/bands/", "/band/discography/id/") + "/tab/all"
-        r = GET(disc_url, headers=UA)
-        if r.status_code != 200:
-            continue
-        soup = BeautifulSoup(r.text, "lxml")
-        rows = soup.select("table.display tbody tr")
+        rows = yield from _ma_discography.steps(best_band_url)
         if not rows:
             continue
 
         # elegir mejor álbum por fuzzy score
-        best_link = None
-        best_score = -1
-        best_title = None
-        for tr in rows:
-            cols = tr.find_all("td")
-            if len(cols) >= 1:
-                a = cols[0].find("a")
-                if not a:
-                    continue
-                album_title = a.get_text(strip=True)
-                score = _fuzzy_score(album_title, title)
-                if score > best_score:
-                    best_score = score
-                    best_link = a.get("href")
-                    best_title = album_title
-
         # si no pasó el umbral fuerte (80), acepta 75 como fallback
-        if not best_link or best_score < 75:
+        i, _ = best_match(title, [album_title for album_title, _, _ in rows], cutoff=75)
+        if i is None or not rows[i][1]:
             continue
+        best_link = rows[i][1]
 
         # 3) Página del álbum -> "Release date:"
-        r = GET(best_link, headers=UA)
-        if r.status_code != 200:
-            continue
-        soup = BeautifulSoup(r.text, "lxml")
-
-        date_text = None
-        for row in soup.select("#album_info dt"):
-            if row.get_text(strip=True).lower().startswith("release date"):
-                dd = row.find_next_sibling("dd")
-                if dd:
-                    txt = dd.get_text(" ", strip=True)
-                    # limpiar ordinales tipo "August 18th, 2016"
-                    txt = re.sub(r"(\d{1,2})(st|nd|rd|th)", r"\1", txt)
-                    date_text = txt
-                break
-
-        if date_text:
-            d = _parse_date(date_text)
-            if d:
-                return d, "metal-archives", best_link
+        d = yield from _ma_album_date.steps(best_link, best_band_url)
+        if d:
+            return d, "metal-archives", best_link
 
     return None
 
@@ -273,61 +415,327 @@ def metal_archives_release_date(artist, title, artist_clean=None):
 def _is_full_date(date_str: str) -> bool:
     return isinstance(date_str, str) and len(date_str.split("-")) == 3
 
-def find_release_date(artist_clean, title, artist_original=None):
+# fuentes que van siempre primero, fuera del orden del planificador: por id, sin búsqueda
+_PINNED = ("discogs_release_date", "musicbrainz_pinned_date")
+
+def _source_calls(name_primary, artist_clean, title, release_id=None, master_id=None, pins=None):
     """
-    Intenta con fuentes rápidas primero. Si una fuente devuelve fecha completa (YYYY-MM-DD),
-    corta. Para Metal Archives se prueban ambos nombres: original y 'clean'.
+    Fuentes en orden de prioridad, como (nombre, callable sin argumentos que devuelve el
+    generador de la fuente): lo recorre net.run o anet.run según el motor.
     """
-    name_primary = (artist_original or artist_clean or "").strip()
-    best_partial = None
-
-    # 1) Rápidas
-    for fn in (musicbrainz_label_event_date, musicbrainz_release_date, wikipedia_release_date):
-        try:
-            r = fn(name_primary, title)
-        except Exception:
-            r = None
-        if not r:
-            continue
-
-        if isinstance(r, tuple):
-            date, source, url = (r + (None, None))[:3]
-        else:
-            date, source, url = r, fn.__name__, None
+    calls = []
+    if release_id or master_id:
+        # 0) Discogs por id: master -> main_release -> released
+        calls.append(("discogs_release_date", lambda: discogs_release_date.steps(release_id, master_id)))
+    if pins and pins.get("rg_mbid"):
+        # 0b) release-group de MusicBrainz emparejado en una ejecución anterior: lookup por MBID
+        calls.append(("musicbrainz_pinned_date",
+                      lambda: musicbrainz_pinned_date.steps(pins["rg_mbid"], pins.get("bandcamp_url"))))
+    return calls + [
+        # 1) Rápidas
+        ("musicbrainz_label_event_date", lambda: musicbrainz_label_event_date.steps(name_primary, title)),
+        ("musicbrainz_release_date",     lambda: musicbrainz_release_date.steps(name_primary, title)),
+        ("wikipedia_release_date",       lambda: wikipedia_release_date.steps(name_primary, title)),
+        # 2) Metal Archives (usa original + clean)
+        ("metal_archives_release_date",  lambda: metal_archives_release_date.steps(artist=name_primary, title=title, artist_clean=artist_clean)),
+        # 3) Bandcamp via MusicBrainz (más lento)
+        ("bandcamp_release_date_via_musicbrainz", lambda: bandcamp_release_date_via_musicbrainz.steps(name_primary, title)),
+    ]
+
+
+def _as_result(r, name):
+    if not r:
+        return None
+    pins = None
+    if isinstance(r, tuple):
+        date, source, url, pins = (r + (None, None, None))[:4]
+    else:
+        date, source, url = r, name, None
+    if isinstance(date, str) and date:
+        res = {"date": date, "source": source, "url": url}
+        if pins:
+            res["pins"] = {k: v for k, v in pins.items() if v}   # MBIDs / URL de Bandcamp emparejados
+        return res
+    return None
 
-        if isinstance(date, str) and date:
-            if _is_full_date(date):
-                return {"date": date, "source": source, "url": url}
-            if best_partial is None:
-                best_partial = {"date": date, "source": source, "url": url}
 
-    # 2) Metal Archives (usa original + clean)
+def _run_source(name, call, cancel=None, log=None):
+    """
+    Ejecuta una fuente y devuelve su resultado normalizado (o None).
+    Si se pasa `log`, se guarda log[name] = (resultado 'full'/'partial'/None, peticiones HTTP).
+    """
+    net.set_cancel(cancel)
+    t = time.perf_counter()
+    before = net.requests_made()
+    outcome, res = "empty", None
     try:
-        r = metal_archives_release_date(artist=name_primary, title=title, artist_clean=artist_clean)
+        with METRICS.source(name):
+            res = _as_result(net.run(call()), name)
+        if res:
+            outcome = "full" if _is_full_date(res["date"]) else "partial"
+        return res
+    except net.Cancelled:
+        outcome = None
+        return None
     except Exception:
-        r = None
-    if r:
-        date, source, url = (r + (None, None))[:3]
-        if isinstance(date, str) and date:
-            if _is_full_date(date):
-                return {"date": date, "source": source, "url": url}
-            if best_partial is None:
-                best_partial = {"date": date, "source": source, "url": url}
-
-    # 3) Bandcamp via MusicBrainz (más lento)
+        outcome = "errors"
+        return None
+    finally:
+        net.set_cancel(None)
+        # las fuentes canceladas por una carrera ya perdida no cuentan como llamada
+        if outcome:
+            METRICS.call(name, (time.perf_counter() - t) * 1000, outcome)
+            if log is not None:
+                log[name] = (outcome if outcome in ("full", "partial") else None,
+                             net.requests_made() - before)
+
+
+# Pool compartido para las carreras entre fuentes (lo usan todos los workers de enrich).
+# Las llamadas a MusicBrainz ocupan su hilo mientras esperan el turno del host (1 pet/s),
+# así que el pool tiene un hilo por fuente de cada worker: si se quedara corto, Wikipedia
+# y Metal Archives esperarían en cola detrás de ellas y la carrera perdería el sentido.
+RACE_SOURCES = 7   # máximo de fuentes por ítem en _source_calls (con ids de Discogs y MBID fijado)
+_RACE_POOL = None
+_RACE_LOCK = threading.Lock()
+
+def configure_race(workers=12):
+    """Dimensiona el pool de carreras para `workers` ítems compitiendo a la vez."""
+    global _RACE_POOL
+    with _RACE_LOCK:
+        size = max(1, workers) * RACE_SOURCES
+        if _RACE_POOL is None or _RACE_POOL._max_workers != size:
+            old, _RACE_POOL = _RACE_POOL, ThreadPoolExecutor(max_workers=size, thread_name_prefix="race")
+            if old is not None:
+                old.shutdown(wait=False)
+        return _RACE_POOL
+
+def _race_pool():
+    with _RACE_LOCK:
+        pool = _RACE_POOL
+    return pool or configure_race()
+
+def _race(calls, tried=None, log=None, results=None):
+    """
+    Lanza todas las fuentes a la vez. La primera fecha completa gana y cancela el resto
+    (las pendientes no arrancan; las que están en curso abortan en su próxima petición).
+    Si sólo hay fechas parciales, gana la de la fuente de mayor prioridad.
+    Devuelve (nombre de la fuente ganadora, resultado) o (None, None).
+    Cada fuente escribe en su propio log; a `log` sólo pasan las que ya habían terminado
+    al volver (las perdedoras siguen un rato en el pool y no deben tocar el del llamante).
+    """
+    cancel = threading.Event()
+    pool = _race_pool()
+    own = [{} for _ in calls]
+    futs = {pool.submit(_run_source, name, call, cancel, own[i]): i for i, (name, call) in enumerate(calls)}
+    partials = {}
+    try:
+        for fut in as_completed(futs):
+            res = fut.result()
+            if tried is not None:
+                tried.append(calls[futs[fut]][0])
+            if results is not None and res:
+                results.append(res)
+            if not res:
+                continue
+            if _is_full_date(res["date"]):
+                return calls[futs[fut]][0], res
+            partials[futs[fut]] = res
+    finally:
+        cancel.set()
+        for fut, i in futs.items():
+            # una fuente terminada ya no escribe: su log está completo
+            if not fut.cancel() and fut.done() and log is not None:
+                log.update(own[i])
+    if not partials:
+        return None, None
+    i = min(partials)
+    return calls[i][0], partials[i]
+
+
+# ---------- motor asyncio (anet) ----------
+async def _run_source_async(name, call, log=None):
+    """_run_source para el motor asyncio: la fuente corre en la tarea actual con anet.run."""
+    import anet
+    t = time.perf_counter()
+    before = anet.requests_made()
+    outcome, res = "empty", None
     try:
-        r = bandcamp_release_date_via_musicbrainz(name_primary, title)
+        with METRICS.source(name):
+            res = _as_result(await anet.run(call()), name)
+        if res:
+            outcome = "full" if _is_full_date(res["date"]) else "partial"
+        return res
+    except asyncio.CancelledError:
+        outcome = None
+        raise
     except Exception:
-        r = None
-    if r:
-        date, source, url = (r + (None, None))[:3]
-        if isinstance(date, str) and date:
-            if _is_full_date(date):
-                return {"date": date, "source": source, "url": url}
-            if best_partial is None:
-                best_partial = {"date": date, "source": source, "url": url}
+        outcome = "errors"
+        return None
+    finally:
+        if outcome:
+            METRICS.call(name, (time.perf_counter() - t) * 1000, outcome)
+            if log is not None:
+                log[name] = (outcome if outcome in ("full", "partial") else None,
+                             anet.requests_made() - before)
+
+
+async def _race_async(calls, tried=None, log=None, results=None):
+    """
+    _race con una tarea por fuente. Las perdedoras se cancelan y se espera a que acaben
+    antes de volver, así que ninguna escribe en `log` después.
+    """
+    tasks = {asyncio.ensure_future(_run_source_async(name, call, log)): i
+             for i, (name, call) in enumerate(calls)}
+    pending, partials = set(tasks), {}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=tasks.get):
+                i, res = tasks[task], task.result()
+                if tried is not None:
+                    tried.append(calls[i][0])
+                if results is not None and res:
+                    results.append(res)
+                if not res:
+                    continue
+                if _is_full_date(res["date"]):
+                    return calls[i][0], res
+                partials[i] = res
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    if not partials:
+        return None, None
+    i = min(partials)
+    return calls[i][0], partials[i]
+
+
+def resolution_key(artist, title):
+    return f"{_canon(artist)}|{_canon(title)}"
+
+
+def resolution_history(artist, title):
+    """Entrada del almacén de resoluciones (intentos, último intento, fuentes probadas), o None."""
+    return get_store().get(resolution_key(artist, title))
+
 
-    return best_partial
+def cached_resolution(artist, title):
+    """Entrada vigente del almacén de resoluciones (fecha completa o back-off sin vencer), o None."""
+    cached = resolution_history(artist, title)
+    if cached and (cached["retry_at"] is None or cached["retry_at"] > time.time()):
+        return cached
+    return None
+
+
+def _plan(artist_clean, title, artist_original, use_cache, labels, formats, release_id, master_id):
+    """
+    Lo de find_release_date antes de consultar fuentes. Devuelve (respuesta, búsqueda):
+    respuesta es (resultado,) si el almacén de resoluciones ya la tiene; si no, búsqueda es
+    (clave, pins, fuentes en orden, rasgos del planificador, nombre del artista).
+    """
+    name_primary = (artist_original or artist_clean or "").strip()
+    key = resolution_key(artist_clean or name_primary, title)
+    pins = None
+    if use_cache:
+        history = get_store().get(key)
+        if history and (history["retry_at"] is None or history["retry_at"] > time.time()):
+            if history["date"]:
+                return ({"date": history["date"], "source": history["source"], "url": history["url"]},), None
+            return (None,), None
+        pins = history and history["pins"]
+
+    calls = _source_calls(name_primary, artist_clean, title, release_id, master_id, pins)
+    feats = planner.features(artist_clean or name_primary, labels, formats)
+    if planner.ENABLED:
+        pinned = [c for c in calls if c[0] in _PINNED]
+        by_name = dict(c for c in calls if c[0] not in _PINNED)
+        calls = pinned + [(name, by_name[name]) for name in planner.get_planner().plan(list(by_name), feats)]
+    return None, (key, calls, feats, name_primary)
+
+
+def _record(search, artist_clean, title, use_cache, winner, best, tried, log, results):
+    """Lo de find_release_date después: victoria, planificador y almacén de resoluciones."""
+    key, _, feats, name_primary = search
+    if winner:
+        METRICS.count("wins", source=winner)
+    if planner.ENABLED:
+        p = planner.get_planner()
+        for name, (outcome, n_requests) in log.items():
+            p.record(feats, name, outcome, n_requests)
+
+    if use_cache:
+        # ids emparejados por cualquier fuente (los del ganador mandan) para el próximo refresco
+        found = {}
+        for res in results:
+            found.update(res.get("pins") or {})
+        found.update((best or {}).get("pins") or {})
+        get_store().put(key, artist_clean or name_primary, title, best, tried,
+                        full=bool(best) and _is_full_date(best["date"]), pins=found)
+    return best
+
+
+def find_release_date(artist_clean, title, artist_original=None, race=False, use_cache=True,
+                      labels=(), formats=(), release_id=None, master_id=None):
+    """
+    Intenta con fuentes rápidas primero. Si una fuente devuelve fecha completa (YYYY-MM-DD),
+    corta. Con ids de Discogs se empieza por la fecha del master en Discogs (una o dos
+    peticiones por id, sin fuzzy). Para Metal Archives se prueban ambos nombres: original y 'clean'.
+    El orden de las fuentes lo decide planner.py según lo que resolvió ítems parecidos
+    (mismo artista, sello o formato); sin historial es el de _source_calls.
+    Con race=True las fuentes se consultan en paralelo (ver _race).
+    Con use_cache=True se consulta/actualiza el almacén de resoluciones (resolutions.py):
+    fechas completas se reutilizan siempre; parciales y fallos hasta que venza su back-off.
+    """
+    answer, search = _plan(artist_clean, title, artist_original, use_cache, labels, formats, release_id, master_id)
+    if answer:
+        return answer[0]
+    calls = search[1]
+    # tried y results sólo los rellena este hilo (en carrera, con lo que _race llegó a
+    # recoger): las fuentes que pierden la carrera siguen un rato en el pool
+    tried, log, results = [], {}, []
+    if race:
+        winner, best = _race(calls, tried, log, results)
+    else:
+        winner = best = None
+        for name, call in calls:
+            res = _run_source(name, call, log=log)
+            tried.append(name)
+            if not res:
+                continue
+            results.append(res)
+            if _is_full_date(res["date"]):
+                winner, best = name, res
+                break
+            if best is None:
+                winner, best = name, res
+    return _record(search, artist_clean, title, use_cache, winner, best, tried, log, results)
+
+
+async def find_release_date_async(artist_clean, title, artist_original=None, race=False, use_cache=True,
+                                  labels=(), formats=(), release_id=None, master_id=None):
+    """find_release_date para el motor asyncio: mismas fuentes, orden y almacén; HTTP con anet."""
+    answer, search = _plan(artist_clean, title, artist_original, use_cache, labels, formats, release_id, master_id)
+    if answer:
+        return answer[0]
+    calls = search[1]
+    tried, log, results = [], {}, []
+    if race:
+        winner, best = await _race_async(calls, tried, log, results)
+    else:
+        winner = best = None
+        for name, call in calls:
+            res = await _run_source_async(name, call, log=log)
+            tried.append(name)
+            if not res:
+                continue
+            results.append(res)
+            if _is_full_date(res["date"]):
+                winner, best = name, res
+                break
+            if best is None:
+                winner, best = name, res
+    return _record(search, artist_clean, title, use_cache, winner, best, tried, log, results)
 
 
 
@@ -347,21 +755,19 @@ def _bandcamp_extract_date(page_html: str):
                 if d:
                     return d
     # 2) meta tags sueltos (fallback muy general)
-    soup = BeautifulSoup(page_html, "lxml")
     # A veces aparece en <meta itemprop="datePublished" content="2016-08-19">
-    tag = soup.find("meta", attrs={"itemprop": "datePublished"}) or \
-          soup.find("meta", attrs={"property": "music:release_date"}) or \
-          soup.find("meta", attrs={"property": "og:release_date"})
-    if tag and tag.get("content"):
-        d = _parse_date(tag["content"])
+    content = extract.bandcamp_meta_date(page_html)
+    if content:
+        d = _parse_date(content)
         if d:
             return d
     # 3) escaneo leve del cuerpo
-    mm = re.search(r"\b([A-Z][a-z]+ \d{1,2}, \d{4}|\d{4}-\d{2}-\d{2})\b", soup.get_text(" ", strip=True))
+    mm = re.search(r"\b([A-Z][a-z]+ \d{1,2}, \d{4}|\d{4}-\d{2}-\d{2})\b", extract.page_text(page_html))
     if mm:
         return _parse_date(mm.group(1))
     return None
 
+@driven
 def bandcamp_release_date_via_musicbrainz(artist, title):
     """
     Busca el release group en MusicBrainz y lee relaciones de URL.
@@ -369,59 +775,63 @@ def bandcamp_release_date_via_musicbrainz(artist, title):
     Preferentemente corresponde al sello si el link es del sello; si no, igual sirve.
     """
     # 1) Buscar release-group por artista + título
-    r = requests.get("https://musicbrainz.org/ws/2/release-group", params={
+    r = yield Fetch("https://musicbrainz.org/ws/2/release-group", ttl="search", params={
         "query": f'releasegroup:"{title}" AND artist:"{artist}"',
         "fmt": "json", "limit": 5
     }, headers=UA, timeout=30)
     if r.status_code != 200:
         return None
     data = r.json()
-    best = None
-    best_score = -1
-    for rg in data.get("release-groups", []):
-        t = rg.get("title", "")
-        score = _fuzzy(t, title)
-        if score > best_score:
-            best_score = score
-            best = rg
-    if not best or best_score < 75:
+    rgs = data.get("release-groups", [])
+    i, _ = best_match(title, [rg.get("title", "") for rg in rgs], cutoff=75)
+    if i is None:
         return None
+    best = rgs[i]
 
     mbid = best.get("id")
     # 2) Traer relaciones de URL para hallar bandcamp
-    r = requests.get(f"https://musicbrainz.org/ws/2/release-group/{mbid}", params={
+    r = yield Fetch(f"https://musicbrainz.org/ws/2/release-group/{mbid}", ttl="lookup", params={
         "fmt": "json", "inc": "url-rels"
     }, headers=UA, timeout=30)
     if r.status_code != 200:
         return None
     rels = r.json().get("relations", []) or []
+    for url in _bandcamp_links(rels):
+        d = yield from _bandcamp_date.steps(url)
+        if d:
+            return d, "bandcamp", url, {"rg_mbid": mbid, "bandcamp_url": url}
+    return None
+
+
+def _bandcamp_links(rels):
     # Tomar primero un album-link en bandcamp
     bc_links = [rel.get("url", {}).get("resource", "") for rel in rels if "bandcamp.com/album" in rel.get("url", {}).get("resource", "")]
     if not bc_links:
         # si no hay /album, toma cualquier bandcamp
         bc_links = [rel.get("url", {}).get("resource", "") for rel in rels if "bandcamp.com" in rel.get("url", {}).get("resource", "")]
-    for url in bc_links:
-        try:
-            p = requests.get(url, headers=UA, timeout=30)
-            if p.status_code == 200:
-                d = _bandcamp_extract_date(p.text)
-                if d:
-                    return d, "bandcamp", url
-        except Exception:
-            continue
+    return bc_links
+
+
+@driven
+def _bandcamp_date(url):
+    try:
+        p = yield Fetch(url, headers=UA, timeout=30)
+        if p.status_code == 200:
+            return _bandcamp_extract_date(p.text)
+    except net.Cancelled:
+        raise
+    except Exception:
+        pass
     return None
 
 # ---------- MUSICBRAINZ (release events: fecha por edición/label) ----------
+@driven
 def musicbrainz_label_event_date(artist, title):
-    r = requests.get("https://musicbrainz.org/ws/2/release", params={
-        "query": f'release:"{title}" AND artist:"{artist}"',
-        "fmt": "json", "limit": 15, "inc": "labels+release-groups+release-events"
-    }, headers=UA, timeout=30)
-    if r.status_code != 200:
+    releases = yield from _mb_release_search.steps(artist, title, "label_event")
+    if releases is None:
         return None
-    data = r.json()
     full, partial = [], []
-    for rel in data.get("releases", []):
+    for rel in releases:
         t = rel.get("title", "")
         arts = " ".join(ac.get("name", "") for ac in rel.get("artist-credit", []))
         if not (_ok(t, title) and (_ok(arts, artist) or _ok(artist, arts))):
@@ -429,16 +839,11 @@ def musicbrainz_label_event_date(artist, title):
         # fecha directa
         d = rel.get("date")
         if d:
-            (full if _is_full_date(d) else partial).append(d)
-        # por eventos
-        for ev in rel.get("release-events", []) or []:
-            d2 = ev.get("date")
+            (full if _is_full_date(d) else partial).append((d, rel))
+        # por eventos (y la first-release-date del grupo, que trae el volcado local)
+        evs = [ev.get("date") for ev in rel.get("release-events", []) or []]
+        evs.append((rel.get("release-group") or {}).get("first-release-date"))
+        for d2 in evs:
             if d2:
-                (full if _is_full_date(d2) else partial).append(d2)
-    if full:
-        d = sorted(full)[0]
-        return d, "musicbrainz", "https://musicbrainz.org"
-    if partial:
-        d = sorted(partial)[0]
-        return d, "musicbrainz", "https://musicbrainz.org"
-    return None
+                (full if _is_full_date(d2) else partial).append((d2, rel))
+    return _mb_pick(full, partial)
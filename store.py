@@ -0,0 +1,201 @@
+import os, json, time, threading
+from utils import load_json, save_json
+from localdb import connect, Lazy
+
+# Almacén SQLite de la colección: ítems raw, resultados de enriquecimiento y overrides.
+# Cada fila se actualiza con su propia transacción, así que enriquecer unos pocos ítems
+# no reescribe nada más. Se activa al importar los JSON existentes:
+#     python app.py store-import
+# y `python app.py store-export` regenera los JSON cuando se necesiten.
+
+DB_PATH = "data/collection.sqlite"
+RAW_JSON = "data/collection.raw.json"
+ENRICHED_JSON = "data/collection.enriched.json"
+OVERRIDES_JSON = "data/overrides.json"
+
+
+def item_key(it):
+    """Clave normalizada artista|título (la misma que usa el dedup de enrich)."""
+    return "|".join(((it.get("artist_clean") or it.get("artist") or "").strip().lower(),
+                     (it.get("title") or "").strip().lower()))
+
+
+def _month_day(date_iso):
+    # 'YYYY-MM-DD' -> MMDD; fechas parciales no tienen día de aniversario
+    parts = (date_iso or "").split("-")
+    if len(parts) != 3:
+        return None
+    try:
+        return int(parts[1]) * 100 + int(parts[2])
+    except ValueError:
+        return None
+
+
+def active(path=DB_PATH):
+    return os.path.exists(path)
+
+
+class CollectionStore:
+    def __init__(self, path=DB_PATH):
+        self.lock = threading.Lock()
+        self.db = connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS raw_items (
+                pos         INTEGER PRIMARY KEY,   -- orden en la colección
+                key         TEXT NOT NULL,
+                instance_id INTEGER,
+                data        TEXT NOT NULL          -- ítem completo en JSON
+            );
+            CREATE INDEX IF NOT EXISTS raw_items_key ON raw_items(key);
+
+            CREATE TABLE IF NOT EXISTS enrichment (
+                key            TEXT PRIMARY KEY,
+                pos            INTEGER,
+                release_date   TEXT,
+                release_source TEXT,
+                release_url    TEXT,
+                month_day      INTEGER,            -- MMDD, sólo fechas completas
+                data           TEXT NOT NULL,      -- fila enriquecida completa en JSON
+                updated_at     REAL
+            );
+            CREATE INDEX IF NOT EXISTS enrichment_month_day ON enrichment(month_day);
+            CREATE INDEX IF NOT EXISTS enrichment_missing ON enrichment(release_date) WHERE release_date IS NULL;
+
+            CREATE TABLE IF NOT EXISTS overrides (
+                key          TEXT PRIMARY KEY,
+                artist       TEXT,
+                title        TEXT,
+                release_date TEXT
+            );
+        """)
+        self.db.commit()
+
+    # --- raw ---
+    def replace_raw(self, items):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM raw_items")
+            self.db.executemany(
+                "INSERT INTO raw_items (pos, key, instance_id, data) VALUES (?, ?, ?, ?)",
+                [(i, item_key(it), it.get("instance_id"), json.dumps(it, ensure_ascii=False))
+                 for i, it in enumerate(items)])
+
+    def raw_items(self):
+        with self.lock:
+            rows = self.db.execute("SELECT data FROM raw_items ORDER BY pos").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    # --- enrichment ---
+    @staticmethod
+    def _enrichment_params(row, pos):
+        return (item_key(row), pos, row.get("release_date"), row.get("release_source"), row.get("release_url"),
+                _month_day(row.get("release_date")), json.dumps(row, ensure_ascii=False), time.time())
+
+    _UPSERT = """
+        INSERT OR REPLACE INTO enrichment
+            (key, pos, release_date, release_source, release_url, month_day, data, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+    def upsert_enrichment(self, row, pos=None):
+        """Inserta/actualiza una fila en su propia transacción (conserva su posición si ya existía)."""
+        with self.lock, self.db:
+            if pos is None:
+                old = self.db.execute("SELECT pos FROM enrichment WHERE key = ?", (item_key(row),)).fetchone()
+                pos = old[0] if old else self.db.execute(
+                    "SELECT COALESCE(MAX(pos), -1) + 1 FROM enrichment").fetchone()[0]
+            self.db.execute(self._UPSERT, self._enrichment_params(row, pos))
+
+    def replace_enrichment(self, rows):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM enrichment")
+            self.db.executemany(self._UPSERT, (self._enrichment_params(row, i) for i, row in enumerate(rows)))
+
+    def enriched(self, missing_only=False):
+        sql = "SELECT data FROM enrichment"
+        if missing_only:
+            sql += " WHERE release_date IS NULL"
+        with self.lock:
+            rows = self.db.execute(sql + " ORDER BY pos").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count_enriched(self, missing_only=False):
+        sql = "SELECT COUNT(*) FROM enrichment"
+        if missing_only:
+            sql += " WHERE release_date IS NULL"
+        with self.lock:
+            return self.db.execute(sql).fetchone()[0]
+
+    def by_month_day(self, lo, hi):
+        """Filas con fecha completa cuyo MMDD está en [lo, hi]."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT data FROM enrichment WHERE month_day BETWEEN ? AND ? ORDER BY month_day, pos",
+                (lo, hi)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def suspicious(self):
+        """Filas con release_date de menos de 4 caracteres (lo que revisa check_enriched.py)."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT data FROM enrichment WHERE release_date IS NOT NULL AND length(release_date) < 4"
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    # --- overrides ---
+    def replace_overrides(self, overrides):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM overrides")
+            self.db.executemany("INSERT OR REPLACE INTO overrides VALUES (?, ?, ?, ?)",
+                                [(item_key(o), o.get("artist"), o.get("title"), o.get("release_date"))
+                                 for o in overrides])
+
+    def overrides(self):
+        with self.lock:
+            rows = self.db.execute("SELECT artist, title, release_date FROM overrides").fetchall()
+        return [{"artist": a, "title": t, "release_date": d} for a, t, d in rows]
+
+    # --- JSON ---
+    def import_json(self, raw_path=RAW_JSON, enriched_path=ENRICHED_JSON, overrides_path=OVERRIDES_JSON):
+        raw = load_json(raw_path) or []
+        enriched = load_json(enriched_path) or []
+        overrides = load_json(overrides_path) or []
+        self.replace_raw(raw)
+        self.replace_enrichment(enriched)
+        self.replace_overrides(overrides)
+        return len(raw), len(enriched), len(overrides)
+
+    def export_json(self, raw_path=RAW_JSON, enriched_path=ENRICHED_JSON):
+        raw, enriched = self.raw_items(), self.enriched()
+        save_json(raw, raw_path)
+        save_json(enriched, enriched_path)
+        return len(raw), len(enriched)
+
+
+get_store = Lazy(CollectionStore)
+
+
+def load_raw():
+    """Ítems raw desde el almacén si está activo; si no, desde el JSON."""
+    return get_store().raw_items() if active() else (load_json(RAW_JSON) or [])
+
+def load_enriched():
+    return get_store().enriched() if active() else load_json(ENRICHED_JSON)
+
+def load_dated(start=None, end=None):
+    """
+    Filas enriquecidas cuyo aniversario puede caer en [start, end] (datetime.date; sin
+    límites, todo el año). Con el almacén sólo se leen las de esos días del año (índice
+    month_day, sólo fechas completas); con el JSON se devuelve todo. None si no hay nada enriquecido.
+    """
+    if not active():
+        return load_json(ENRICHED_JSON)
+    db = get_store()
+    if not db.count_enriched():
+        return None
+    if start is None or end is None or (end - start).days >= 365:
+        return db.by_month_day(101, 1231)
+    lo, hi = start.month * 100 + start.day, end.month * 100 + end.day
+    out = []
+    for a, b in [(lo, hi)] if lo <= hi else [(lo, 1231), (101, hi)]:
+        # los 29-feb se celebran el 28-feb en años no bisiestos
+        out += db.by_month_day(a, 229 if b == 228 else b)
+    return out
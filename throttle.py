@@ -0,0 +1,131 @@
+import asyncio, threading, time
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlsplit
+
+# Presupuesto por host: peticiones/segundo, ráfaga máxima y peticiones simultáneas.
+# MusicBrainz pide 1 req/s por IP; el resto se deja algo más holgado.
+HOST_LIMITS = {
+    "musicbrainz.org":    {"rate": 1.0, "burst": 1, "concurrency": 1},
+    "wikipedia.org":      {"rate": 10.0, "burst": 10, "concurrency": 4},
+    "metal-archives.com": {"rate": 1.0, "burst": 2, "concurrency": 2},
+    "bandcamp.com":       {"rate": 2.0, "burst": 2, "concurrency": 2},
+    # 60 peticiones/min con token (ventana móvil): ráfaga corta y luego 1/s
+    "api.discogs.com":    {"rate": 1.0, "burst": 5, "concurrency": 2},
+}
+DEFAULT_LIMIT = {"rate": None, "burst": 1, "concurrency": 8}
+
+
+class HostBudget:
+    """Token bucket (con reserva: los tokens pueden quedar en negativo = cola) + semáforo."""
+
+    def __init__(self, rate=None, burst=1, concurrency=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.sem = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Reserva un token y devuelve cuántos segundos hay que esperar para usarlo."""
+        with self.lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.rate:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                self.tokens -= 1
+                if self.tokens < 0:
+                    wait = -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def block(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class AsyncHostBudget(HostBudget):
+    """El mismo token bucket con un asyncio.Semaphore: esperar turno no ocupa un hilo."""
+
+    def __init__(self, rate=None, burst=1, concurrency=1):
+        super().__init__(rate, burst, concurrency)
+        self.sem = asyncio.Semaphore(concurrency)
+
+
+class HostScheduler:
+    """
+    Planificador compartido por todos los hilos: cada host tiene su propio presupuesto,
+    así que un host frenado (429/503) sólo bloquea a quien lo está usando.
+    """
+
+    Budget = HostBudget
+
+    def __init__(self, limits=None, default=None):
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.default = dict(DEFAULT_LIMIT if default is None else default)
+        self.budgets = {}
+        self.lock = threading.Lock()
+
+    def _key(self, url):
+        host = (urlsplit(url).hostname or "").lower()
+        # se usa el sufijo configurado más largo: "xyz.bandcamp.com" -> "bandcamp.com"
+        best = None
+        for k in self.limits:
+            if host == k or host.endswith("." + k):
+                if best is None or len(k) > len(best):
+                    best = k
+        return best or host
+
+    def budget(self, url):
+        key = self._key(url)
+        with self.lock:
+            b = self.budgets.get(key)
+            if b is None:
+                b = self.budgets[key] = self.Budget(**self.limits.get(key, self.default))
+            return b
+
+    def configure(self, host, **limits):
+        with self.lock:
+            self.limits[host] = {**self.limits.get(host, self.default), **limits}
+            self.budgets.pop(host, None)
+
+    @contextmanager
+    def slot(self, url):
+        b = self.budget(url)
+        with b.sem:
+            delay = b._reserve()
+            if delay > 0:
+                time.sleep(delay)
+            yield b
+
+    def backoff(self, url, seconds):
+        self.budget(url).block(seconds)
+
+
+class AsyncHostScheduler(HostScheduler):
+    """
+    Planificador del motor asyncio (anet.py): los mismos presupuestos, pero cada petición
+    espera su turno con `async with slot(url)`. Los semáforos son del bucle en que se
+    usan, así que se crea uno por ejecución (con los límites vigentes de SCHEDULER).
+    """
+    Budget = AsyncHostBudget
+
+    @asynccontextmanager
+    async def slot(self, url):
+        b = self.budget(url)
+        async with b.sem:
+            delay = b._reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield b
+
+
+SCHEDULER = HostScheduler()
+
+
+def retry_after(resp, default=5.0):
+    try:
+        return float(resp.headers.get("Retry-After") or default)
+    except ValueError:
+        return default
@@ -1,4 +1,4 @@
-import os, json, datetime
+import os, json, datetime, bisect
 import re
 
 def _is_full_date(date_iso: str) -> bool:
@@ -8,8 +8,11 @@ def ensure_data_dir():
     os.makedirs("data", exist_ok=True)
 
 def save_json(obj, path):
-    with open(path, "w", encoding="utf-8") as f:
+    # temporal + rename: un corte a mitad de escritura no deja el JSON truncado
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(obj, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
 
 def load_json(path):
     if not os.path.exists(path):
@@ -45,30 +48,93 @@ def _next_anniv(date_iso: str, today=None):
         return this_year, (this_year - today).days
 
 
-def upcoming_anniversaries(data, days_ahead=7, include_partial=False):
-    today = datetime.date.today()
-    rows = []
-    for it in data:
-        rd = it.get("release_date")
-        if not rd:
-            continue
-        if not include_partial and not _is_full_date(rd):
-            continue  # omite YYYY o YYYY-MM
-        next_dt, delta = _next_anniv(rd, today)
-        if next_dt is None:
-            continue
-        if 0 <= delta <= days_ahead:
-            rows.append({
+def _is_leap(y):
+    return y % 4 == 0 and (y % 100 != 0 or y % 400 == 0)
+
+
+class AnniversaryIndex:
+    """
+    Índice por día del año (mes*100+día) de los lanzamientos, ordenado una sola vez.
+    Cualquier ventana de fechas (próximos N días, un mes, un rango, cruzando fin de año)
+    se resuelve con bisect: O(log n + k).
+    Los 29-feb se celebran el 28-feb en años no bisiestos.
+    """
+
+    def __init__(self, data, include_partial=False):
+        entries = []
+        for it in data or []:
+            rd = it.get("release_date")
+            if not rd:
+                continue
+            if not include_partial and not _is_full_date(rd):
+                continue  # omite YYYY o YYYY-MM
+            norm = _normalize_iso(rd)
+            if not norm:
+                continue
+            _, m, d = [int(x) for x in norm.split("-")]
+            row = {
                 "artist_clean": it.get("artist_clean") or it.get("artist"),
                 "title": it.get("title"),
                 "release_date": rd,
                 "release_source": it.get("release_source"),
                 "release_url": it.get("release_url"),
-                "next_anniv_date": next_dt.isoformat(),
-                "days_left": delta
-            })
-    rows.sort(key=lambda r: (r["next_anniv_date"], r["artist_clean"], r["title"]))
-    return rows
+            }
+            entries.append((m * 100 + d, row["artist_clean"] or "", row["title"] or "", row))
+        entries.sort(key=lambda e: e[:3])
+        self.keys = [e[0] for e in entries]
+        self.rows = [e[3] for e in entries]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _year_slice(self, year, lo, hi):
+        """Posiciones [i, j) con clave en [lo, hi] para ese año (incluye 29-feb el 28 si no es bisiesto)."""
+        if not _is_leap(year) and lo <= 228 <= hi:
+            hi = max(hi, 229)
+        return bisect.bisect_left(self.keys, lo), bisect.bisect_right(self.keys, hi)
+
+    def between(self, start, end, today=None, unique=False):
+        """Aniversarios con fecha en [start, end] (datetime.date), ordenados por fecha/artista/título."""
+        today = today or start
+        out, seen = [], set()
+        for year in range(start.year, end.year + 1):
+            lo_d = start if year == start.year else datetime.date(year, 1, 1)
+            hi_d = end if year == end.year else datetime.date(year, 12, 31)
+            i, j = self._year_slice(year, lo_d.month * 100 + lo_d.day, hi_d.month * 100 + hi_d.day)
+            remapped = False
+            chunk = []
+            for pos in range(i, j):
+                if unique:
+                    if pos in seen:
+                        continue
+                    seen.add(pos)
+                key = self.keys[pos]
+                m, d = divmod(key, 100)
+                if key == 229 and not _is_leap(year):
+                    d = 28
+                    remapped = True
+                dt = datetime.date(year, m, d)
+                chunk.append({**self.rows[pos], "next_anniv_date": dt.isoformat(), "days_left": (dt - today).days})
+            if remapped:
+                chunk.sort(key=lambda r: (r["next_anniv_date"], r["artist_clean"] or "", r["title"] or ""))
+            out.extend(chunk)
+        return out
+
+    def upcoming(self, days_ahead=7, today=None):
+        today = today or datetime.date.today()
+        return self.between(today, today + datetime.timedelta(days=days_ahead), today, unique=True)
+
+    def month(self, month=None, year=None, today=None):
+        today = today or datetime.date.today()
+        month = month or today.month
+        year = year or today.year
+        first = datetime.date(year, month, 1)
+        last = datetime.date(year + (month == 12), month % 12 + 1, 1) - datetime.timedelta(days=1)
+        return self.between(first, last, today)
+
+
+def upcoming_anniversaries(data, days_ahead=7, include_partial=False):
+    return AnniversaryIndex(data, include_partial=include_partial).upcoming(days_ahead)
 
 def _normalize_iso(date_iso: str):
     """